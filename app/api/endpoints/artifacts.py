@@ -1,24 +1,144 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+import mimetypes
+import os
+from typing import Optional, Tuple, Union
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.config import settings
 from app.services.artifact_store import artifact_service
+from app.utils.aio_files import FileTooLarge, iter_file
 
 router = APIRouter()
 
+
+async def _read_chunks(file: UploadFile):
+    while chunk := await file.read(settings.ARTIFACT_CHUNK_SIZE):
+        yield chunk
+
+
+def _parse_range(header: str, size: int) -> Union[Tuple[int, int], bool, None]:
+    """
+    Parse a single ``bytes=`` range. Returns ``(start, end)`` inclusive,
+    False if unsatisfiable, or None if the header should be ignored
+    (malformed or multi-range), in which case the full body is served.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end or (not first and not last):
+        return False
+    return start, min(end, size - 1)
+
+
+def _etag(path: str) -> str:
+    # Artifacts are immutable once written, so size + mtime identify content
+    st = os.stat(path)
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
 @router.post("/upload/{run_id}")
 async def upload(run_id: str, file: UploadFile = File(...)):
-    data = await file.read()
-    aid = artifact_service.save_bytes(run_id, file.filename, data)
-    return {"artifact_id": aid}
+    try:
+        return await artifact_service.save_stream(
+            run_id, file.filename, _read_chunks(file),
+            settings.ARTIFACT_MAX_UPLOAD_BYTES, file.content_type,
+        )
+    except FileTooLarge as e:
+        raise HTTPException(413, str(e))
 
 @router.get("/run/{run_id}")
-async def list_run_artifacts(run_id: str):
-    """List all artifacts for a specific run"""
-    artifacts = artifact_service.list_by_run(run_id)
-    return {"artifacts": artifacts}
+async def list_run_artifacts(
+    run_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """List artifacts for a run, newest first; pass ``next_cursor`` back as ``cursor`` for the next page"""
+    try:
+        return await artifact_service.list_by_run(run_id, limit, cursor)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
 
 @router.get("/{artifact_id}")
-async def get_artifact(artifact_id: str):
-    path = artifact_service.get_path(artifact_id)
-    if not path:
+async def get_artifact(artifact_id: str, request: Request):
+    """Download an artifact. Supports single byte ranges and conditional GETs."""
+    info = await artifact_service.resolve(artifact_id)
+    if not info:
         raise HTTPException(404, "Artifact not found")
-    return FileResponse(path)
+    path = info["path"]
+    media_type = info["content_type"] or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    etag = f'"{info["sha256"]}"' if info["sha256"] else _etag(path)
+    encoding = info["encoding"]
+    range_header = request.headers.get("range")
+    if encoding and not range_header:
+        # Compressed blob: send it as-is when the client accepts the encoding.
+        # That is a different representation, so it gets its own ETag and an
+        # If-Range naming it never matches the decompressed bytes. Ranges
+        # only address the decompressed bytes, so none are offered on it.
+        accepted = [e.split(";")[0].strip() for e in request.headers.get("accept-encoding", "").split(",")]
+        if encoding in accepted:
+            encoded_etag = f'"{info["sha256"]}-{encoding}"'
+            headers = {"ETag": encoded_etag, "Vary": "Accept-Encoding", "Accept-Ranges": "none"}
+            if _etag_matches(request.headers.get("if-none-match"), encoded_etag):
+                return Response(status_code=304, headers=headers)
+            return StreamingResponse(
+                iter_file(path, chunk_size=settings.ARTIFACT_CHUNK_SIZE),
+                media_type=media_type,
+                headers={**headers, "Content-Encoding": encoding, "Content-Length": str(os.path.getsize(path))},
+            )
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if encoding:
+        headers["Vary"] = "Accept-Encoding"
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        # Ranges always address the original bytes, decompressing if need be
+        size = info["size"] if encoding else os.path.getsize(path)
+        parsed = _parse_range(range_header, size)
+        if parsed is False:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if parsed:
+            start, end = parsed
+            if encoding:
+                body = artifact_service.blobs.iter_decoded(
+                    info["sha256"], encoding, settings.ARTIFACT_CHUNK_SIZE, start, end,
+                )
+            else:
+                body = iter_file(path, start, end, settings.ARTIFACT_CHUNK_SIZE)
+            return StreamingResponse(
+                body,
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(end - start + 1),
+                },
+            )
+    if encoding:
+        return StreamingResponse(
+            artifact_service.blobs.iter_decoded(info["sha256"], encoding, settings.ARTIFACT_CHUNK_SIZE),
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(info["size"])},
+        )
+    return FileResponse(path, media_type=media_type, headers=headers)
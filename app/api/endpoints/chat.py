@@ -1,24 +1,45 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from app.config import settings
 from app.services.chat_service import process_chat_message
-from app.services.chat_memory import get_chat_history as fetch_chat_history
-from app.utils.task_queue import task_queue
+from app.services.chat_memory import get_history_page
+from app.utils.task_queue import task_queue, QueueFull
 
 router = APIRouter()
 
 @router.post("/{thread_id}/message")
 async def send_message(thread_id: str, body: dict):
     message = body["message"]
-    await task_queue.add_task(
-        process_chat_message,
-        thread_id,
-        message
-    )
+    try:
+        # Keyed by thread so turns in one thread stay ordered
+        await task_queue.add_task(
+            process_chat_message,
+            thread_id,
+            message,
+            key=thread_id,
+            lane="interactive",
+            timeout=settings.TASK_QUEUE_PUT_TIMEOUT,
+        )
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Server busy, try again later")
 
     return {"status": "queued"}
 
 @router.get("/{thread_id}/history")
-async def get_chat_history(thread_id: str):
+async def get_chat_history(
+    thread_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = None,
+):
     """
-    Fetch full chat history for a thread
+    Fetch the newest ``limit`` messages of a thread, oldest first. The
+    ``X-Next-Cursor`` header, passed back as ``before``, pages to older ones.
     """
-    return await fetch_chat_history(thread_id)
+    try:
+        messages, next_cursor = await get_history_page(thread_id, limit, before)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return messages
@@ -1,7 +1,45 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.auth import verify_token
+from app.utils.task_queue import task_queue
+from app.utils.job_queue import job_queue
+from app.llm.cache import llm_cache
+from app.utils.metrics import metrics
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "message": "Monitoring endpoint is active ✅"}
+
+@router.get("/queue")
+async def queue_stats():
+    """Per-lane depth and wait-time histograms of the task queue"""
+    return task_queue.stats()
+
+@router.get("/jobs", dependencies=[Depends(verify_token)])
+async def job_stats():
+    """
+    Queued, leased and dead-lettered jobs, with the latest dead letters.
+    Payloads hold user input, so they are left out (see ``python -m app.worker --dead``).
+    """
+    dead = [
+        {k: v for k, v in job.items() if k != "payload"}
+        for job in await job_queue.dead_letters(20)
+    ]
+    return {**await job_queue.stats(), "dead_letters": dead}
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    """Hit/miss counters of the LLM response cache"""
+    return llm_cache.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """All metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/json")
+async def metrics_snapshot():
+    """All metrics as JSON"""
+    return metrics.snapshot()
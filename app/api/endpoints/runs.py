@@ -1,44 +1,81 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
+from app.middleware.rate_limit import client_identity
 from app.schemas.run import RunCreate, RunInfo
 from app.services.run_manager import run_manager
-from app.utils.task_queue import task_queue
-from app.services.workflow_service import _execute_workflow
+from app.services.artifact_store import artifact_service
+from app.services.workflow_service import enqueue_run, enqueue_runs, load_resume_checkpoint, run_job_active
+from app.services.workflow_registry import workflow_registry
 from sqlalchemy import select
 from app.models.run import Run 
 import json
-import asyncio
 
 
 router = APIRouter()
 
 @router.post("/", response_model=dict)
-async def create_run(req: RunCreate, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def create_run(req: RunCreate, request: Request, background_tasks: BackgroundTasks,
+                     db: AsyncSession = Depends(get_db)):
+    workflow_id = req.workflow_id or "default"
+    if not workflow_registry.get(workflow_id):
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
     run_id = await run_manager.create(
         db, 
         req.name or f"run-{req.workflow_id or 'default'}", 
         meta=req.payload or {}
     )
-    asyncio.create_task(_execute_workflow(run_id, req.payload or {}))
+    # Single runs go ahead of batches, and callers share each lane fairly
+    await enqueue_run(run_id, req.payload or {}, workflow_id, lane="interactive",
+                      tenant=client_identity(request.scope))
     return {"run_id": run_id}
 
+@router.post("/batch", response_model=dict)
+async def create_runs(reqs: List[RunCreate], request: Request, db: AsyncSession = Depends(get_db)):
+    """Create many runs in one insert and queue their jobs in another"""
+    workflow_ids = [req.workflow_id or "default" for req in reqs]
+    unknown = sorted({w for w in workflow_ids if not workflow_registry.get(w)})
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Workflows not found: {', '.join(unknown)}")
+    run_ids = await run_manager.create_many(db, [
+        (req.name or f"run-{workflow_id}", req.payload or {})
+        for req, workflow_id in zip(reqs, workflow_ids)
+    ])
+    await enqueue_runs([
+        (run_id, req.payload or {}, workflow_id)
+        for run_id, req, workflow_id in zip(run_ids, reqs, workflow_ids)
+    ], tenant=client_identity(request.scope))
+    return {"run_ids": run_ids}
+
 @router.get("/", response_model=list)
-async def list_runs(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Run))
-    runs = result.scalars().all()
-    return [
-        {
-            "id": r.id,
-            "name": r.name,
-            "status": r.status,
-            "created_at": r.created_at.isoformat() if r.created_at else None,
-            "updated_at": r.updated_at.isoformat() if r.updated_at else None,
-            "meta": json.loads(r.run_meta) if isinstance(r.run_meta, str) else (r.run_meta or {}),
-            "result": json.loads(r.result) if isinstance(r.result, str) else r.result
-        }
-        for r in runs
-    ]
+async def list_runs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    name: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated, e.g. id,name,status"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Runs, newest first, ``limit`` per page. The ``X-Next-Cursor`` header,
+    passed back as ``cursor``, fetches the next page. ``fields`` limits the
+    columns returned; leave out meta/result to skip the large JSON columns.
+    """
+    try:
+        runs, next_cursor = await run_manager.list(
+            db, limit, cursor, status, name, created_after, created_before,
+            fields.split(",") if fields else None,
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return runs
 
 @router.get("/{run_id}", response_model=dict)
 async def get_run(run_id: str, db: AsyncSession = Depends(get_db)):
@@ -53,10 +90,36 @@ async def get_run(run_id: str, db: AsyncSession = Depends(get_db)):
         "status": run.status,
         "created_at": run.created_at.isoformat() if run.created_at else None,
         "updated_at": run.updated_at.isoformat() if run.updated_at else None,
+        "current_node": run.current_node,
+        "node_status": run.node_status,
+        "nodes_completed": run.nodes_completed,
         "meta": json.loads(run.run_meta) if isinstance(run.run_meta, str) else (run.run_meta or {}),
         "result": json.loads(run.result) if isinstance(run.result, str) else run.result
     }
 
+@router.post("/{run_id}/resume", response_model=dict)
+async def resume_run(run_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Continue a failed, cancelled or interrupted run from its latest checkpoint"""
+    run = await run_manager.get(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    if run.status == "completed":
+        raise HTTPException(status_code=409, detail="Run already completed")
+    checkpoint = await load_resume_checkpoint(run_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=409, detail="Run has no checkpoint to resume from")
+    if await run_job_active(run_id):
+        raise HTTPException(status_code=409, detail="Run is already queued or running")
+    # Before queueing, or a worker could pick the job up and skip the failed run
+    previous = run.status
+    await run_manager.update(db, run_id, status="running")
+    if not await enqueue_run(run_id, checkpoint["payload"], checkpoint["workflow"],
+                             tenant=client_identity(request.scope)):
+        # Lost a race with another resume or a retry
+        await run_manager.update(db, run_id, status=previous)
+        raise HTTPException(status_code=409, detail="Run is already queued or running")
+    return {"run_id": run_id, "status": "running", "from_step": checkpoint["step"]}
+
 @router.delete("/{run_id}")
 async def delete_run(run_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a run by ID"""
@@ -66,6 +129,7 @@ async def delete_run(run_id: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Run not found")
     await db.delete(run)
     await db.commit()
+    await artifact_service.delete_by_run(run_id)
     return {"message": "Run deleted successfully"}
 
 @router.patch("/{run_id}")
@@ -1,18 +1,30 @@
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.auth import verify_websocket
 from app.utils.stream_manager import stream_manager
 import asyncio
 
 router = APIRouter()
 
 @router.websocket("/{thread_id}")
-async def ws_run(websocket: WebSocket, thread_id: str):
+async def ws_run(websocket: WebSocket, thread_id: str, last_event_id: Optional[int] = None):
+    """
+    Stream events for a run / thread. Reconnecting clients pass the ``seq``
+    of the last event they received as ``?last_event_id=`` to get the missed
+    events replayed first. With AUTH_ENABLED the bearer token goes in the
+    Authorization header or ``?token=``.
+    """
+    if not await verify_websocket(websocket):
+        return
     await websocket.accept()   # ← REQUIRED
-    await stream_manager.connect(thread_id, websocket)
+    # Send before subscribing; afterwards only the subscriber's writer task sends
+    await websocket.send_json({"msg": f"connected to {thread_id}"})
+    await stream_manager.connect(thread_id, websocket, last_event_id)
 
     try:
-        await websocket.send_json({"msg": f"connected to {thread_id}"})
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         await stream_manager.disconnect(thread_id, websocket)
-
@@ -1,7 +1,16 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from app.services.workflow_registry import workflow_registry
 
 router = APIRouter()
 
 @router.get("/")
 async def get_workflows():
-    return {"message": "Workflows endpoint is active 🚀"}
+    """List registered workflow graphs"""
+    return {"workflows": workflow_registry.list()}
+
+@router.get("/{workflow_id}")
+async def get_workflow(workflow_id: str):
+    graph = workflow_registry.get(workflow_id)
+    if not graph:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    return graph.describe()
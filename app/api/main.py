@@ -1,23 +1,30 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.auth import verify_token
 from app.api.endpoints import runs as runs_endpoint
 from app.api.endpoints import artifacts as artifacts_endpoint
 from app.api.endpoints import workflows as workflows_endpoint
 from app.api.endpoints import websocket as websocket_endpoint
 from app.api.endpoints import monitoring as monitoring_endpoint
 from app.api.endpoints import chat as chat_endpoint
+from app.api import stream as stream_endpoint
 
 
 api_router = APIRouter()
 
-for mod, prefix, tag in [
-    (runs_endpoint, "/runs", ["runs"]),
-    (artifacts_endpoint, "/artifacts", ["artifacts"]),
-    (workflows_endpoint, "/workflows", ["workflows"]),
-    (websocket_endpoint, "/ws", ["websocket"]),
-    (monitoring_endpoint, "/monitoring", ["monitoring"]),
-    (chat_endpoint, "/chat", ["chat"]),
+# WebSocket routes authenticate themselves (verify_websocket) before accepting.
+# Monitoring stays open for health checks and scrapers, except /jobs
+authenticated = [Depends(verify_token)]
+
+for mod, prefix, tag, deps in [
+    (runs_endpoint, "/runs", ["runs"], authenticated),
+    (artifacts_endpoint, "/artifacts", ["artifacts"], authenticated),
+    (workflows_endpoint, "/workflows", ["workflows"], []),
+    (websocket_endpoint, "/ws", ["websocket"], []),
+    (monitoring_endpoint, "/monitoring", ["monitoring"], []),
+    (chat_endpoint, "/chat", ["chat"], authenticated),
+    (stream_endpoint, "/stream", ["stream"], authenticated),
 ]:
     if not hasattr(mod, "router"):
         raise ImportError(f"Module {mod.__name__!r} does not expose 'router'. Check {mod.__file__}")
-    api_router.include_router(getattr(mod, "router"), prefix=prefix, tags=tag)
+    api_router.include_router(getattr(mod, "router"), prefix=prefix, tags=tag, dependencies=deps)
 
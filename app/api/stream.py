@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from app.utils.stream_manager import stream_manager
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("/{thread_id}")
+async def stream_events(
+    thread_id: str,
+    request: Request,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events stream of a run / thread, carrying the same events as
+    the WebSocket. Each event's ``id`` is its ``seq``, so browsers resume
+    automatically via ``Last-Event-ID``; ``?last_event_id=`` works too.
+    """
+    after = last_event_id_header if last_event_id_header is not None else last_event_id
+    sub = await stream_manager.subscribe(thread_id, after)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.closed and not await request.is_disconnected():
+                try:
+                    seq, text = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                notice = sub.take_lag_notice()
+                if notice:
+                    yield f"event: lagged\ndata: {notice}\n\n"
+                yield f"id: {seq}\ndata: {text}\n\n"
+        finally:
+            await stream_manager.unsubscribe(thread_id, sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
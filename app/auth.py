@@ -1,13 +1,198 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+"""
+Bearer-token authentication.
+
+Tokens are verified against a key set: ``JWT_SECRET`` (HS256) for tokens
+without a ``kid``, extra HS256 secrets by kid in ``JWT_SECRETS``, and the
+RS256/ES256 (or oct) keys of a local JWKS file at ``JWT_JWKS_PATH``. The
+JWKS file is re-read when it changes, so keys rotate by adding the new key,
+switching issuers over, then removing the old one.
+
+Verified claims are cached per token until ``exp`` (at most
+``JWT_CACHE_TTL`` seconds), so a client reusing a token pays for the
+signature check once. The cache is cleared whenever the key set changes.
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 import jwt
+from fastapi import Depends, HTTPException, WebSocket, status
+from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+
+class KeySet:
+    """Verification keys by kid; ``None`` is the key for tokens without one."""
+
+    def __init__(self, secret: Optional[str], secrets: Dict[str, str], jwks_path: Optional[str],
+                 reload_interval: float = 5.0):
+        self.secret = secret
+        self.secrets = secrets
+        self.jwks_path = jwks_path
+        self.reload_interval = reload_interval
+        self.version = 0
+        self._keys: Dict[Optional[str], Tuple[object, str]] = {}
+        self._jwks_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self):
+        keys: Dict[Optional[str], Tuple[object, str]] = {}
+        if self.secret:
+            keys[None] = (self.secret, "HS256")
+        for kid, secret in self.secrets.items():
+            keys[kid] = (secret, "HS256")
+        if self.jwks_path:
+            try:
+                self._jwks_mtime = os.stat(self.jwks_path).st_mtime
+                with open(self.jwks_path) as f:
+                    jwks = jwt.PyJWKSet.from_dict(json.load(f))
+            except FileNotFoundError:
+                self._jwks_mtime = None
+            else:
+                for jwk in jwks.keys:
+                    keys[jwk.key_id] = (jwk.key, jwk.algorithm_name)
+        self._keys = keys
+        self.version += 1
+
+    def _maybe_reload(self):
+        if not self.jwks_path:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.jwks_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._jwks_mtime:
+            self._load()
+
+    def get(self, kid: Optional[str]) -> Optional[Tuple[object, str]]:
+        self._maybe_reload()
+        return self._keys.get(kid)
+
+
+class TokenCache:
+    """LRU of verified claims, each kept until its token's ``exp`` or ``ttl``."""
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        entry = self._entries.get(token)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[1]
+            del self._entries[token]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, claims: dict):
+        expires = time.time() + self.ttl
+        if "exp" in claims:
+            expires = min(expires, float(claims["exp"]))
+        self._entries[token] = (expires, claims)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def peek(self, token: str) -> Optional[dict]:
+        """Like get(), but leaves the LRU order and hit counters alone."""
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+
+key_set = KeySet(settings.JWT_SECRET, settings.JWT_SECRETS, settings.JWT_JWKS_PATH)
+token_cache = TokenCache(settings.JWT_CACHE_SIZE, settings.JWT_CACHE_TTL)
+_cache_version = key_set.version
+
+
+def decode_token(token: str) -> dict:
+    """Verified claims of ``token``; raises ``jwt.PyJWTError`` if it is not valid."""
+    global _cache_version
+    key_set._maybe_reload()
+    if key_set.version != _cache_version:
+        # A key may have been removed; tokens it signed must be checked again
+        token_cache.clear()
+        _cache_version = key_set.version
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    kid = jwt.get_unverified_header(token).get("kid")
+    entry = key_set.get(kid)
+    if entry is None:
+        raise jwt.InvalidKeyError(f"Unknown signing key: {kid}")
+    key, algorithm = entry
+    claims = jwt.decode(
+        token, key, algorithms=[algorithm],
+        audience=settings.JWT_AUDIENCE, issuer=settings.JWT_ISSUER,
+    )
+    token_cache.put(token, claims)
+    return claims
+
+
+def cached_claims(token: str) -> Optional[dict]:
+    """
+    Claims of a token that verified earlier and has not expired, or None.
+    Never checks a signature, so it is cheap enough to call before
+    authentication (the rate limiter uses it to key on verified subjects).
+    """
+    if key_set.version != _cache_version:
+        return None
+    return token_cache.peek(token)
+
+
+async def verify_token(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[dict]:
+    """Route dependency: the caller's claims, or None when AUTH_ENABLED is off."""
+    if not settings.AUTH_ENABLED:
+        return None
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return decode_token(token)
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+async def verify_websocket(websocket: WebSocket) -> bool:
+    """
+    Authenticate a WebSocket before accepting it, from the Authorization
+    header or a ``?token=`` query parameter (browsers cannot set headers on
+    WebSockets). Closes the socket with 1008 and returns False on failure.
+    """
+    if not settings.AUTH_ENABLED:
+        return True
+    token = websocket.query_params.get("token")
+    auth = websocket.headers.get("authorization", "")
+    if not token and auth[:7].lower() == "bearer ":
+        token = auth[7:].strip()
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        return payload
+        if token:
+            websocket.state.claims = decode_token(token)
+            return True
     except jwt.PyJWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        pass
+    await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
+    return False
@@ -1,5 +1,5 @@
-from pydantic import BaseSettings
-from typing import List
+from pydantic_settings import BaseSettings
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "LangGraph-FastAPI"
@@ -9,7 +9,152 @@ class Settings(BaseSettings):
     CORS_ORIGINS: List[str] = ["*"]
     JWT_SECRET: str = "change-me"
 
+    # Bearer-token auth on the run, chat, artifact and stream routes. Tokens
+    # without a "kid" header use JWT_SECRET (HS256); others are looked up in
+    # JWT_SECRETS (kid -> HS256 secret) or the JWKS file at JWT_JWKS_PATH
+    # (RS256/ES256), which is re-read when it changes
+    AUTH_ENABLED: bool = False
+    JWT_SECRETS: Dict[str, str] = {}
+    JWT_JWKS_PATH: Optional[str] = None
+    JWT_AUDIENCE: Optional[str] = None
+    JWT_ISSUER: Optional[str] = None
+    # Verified tokens are cached until exp, at most JWT_CACHE_TTL seconds
+    JWT_CACHE_TTL: float = 300
+    JWT_CACHE_SIZE: int = 10000
+
+    # Database; plain postgresql:// URLs use the async psycopg driver
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Applied to every new SQLite connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Negative values are KiB, so -64000 is a ~64MB page cache per connection
+    SQLITE_CACHE_SIZE: int = -64000
+
+    # Task queue
+    TASK_QUEUE_WORKERS: int = 4
+    TASK_QUEUE_MAXSIZE: int = 1000
+    TASK_QUEUE_PUT_TIMEOUT: float = 1.0
+    # Relative share per tenant (caller / thread id) within a lane, for both
+    # the task queue and the SQL job queue; default 1.0
+    TASK_QUEUE_TENANT_WEIGHTS: Dict[str, float] = {}
+
+    # Durable job queue that runs workflows: "sql" (jobs table in
+    # DATABASE_URL) or "redis" (a Redis stream at REDIS_URL). A job is leased
+    # for JOB_LEASE_SECONDS and renewed while it runs; if its worker dies it
+    # is delivered again once the lease expires. Failures are retried with
+    # exponential backoff, then dead-lettered after JOB_MAX_ATTEMPTS
+    JOB_QUEUE_BACKEND: str = "sql"
+    JOB_LEASE_SECONDS: float = 60
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_DELAY: float = 2.0
+    JOB_RETRY_MAX_DELAY: float = 300.0
+    JOB_POLL_INTERVAL: float = 1.0
+    # Jobs run concurrently per worker process. The API process runs a worker
+    # too unless JOB_WORKER_IN_API is off; `python -m app.worker` starts more
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_WORKER_IN_API: bool = True
+    JOB_SHUTDOWN_TIMEOUT: float = 30.0
+
+    # Checkpoint / state storage: "sql" (checkpoints table) or "log" (append-only file)
+    CHECKPOINT_BACKEND: str = "sql"
+    CHECKPOINT_LOG_PATH: str = "data/checkpoints.log"
+
+    # Artifacts
+    ARTIFACT_CHUNK_SIZE: int = 1024 * 1024
+    ARTIFACT_MAX_UPLOAD_BYTES: Optional[int] = None
+    # "cas" dedupes by content hash in data/blobs; "plain" keeps one file per artifact
+    ARTIFACT_STORAGE: str = "cas"
+    # Applied to compressible content types in cas mode: zstd (needs zstandard, else gzip), gzip or none
+    ARTIFACT_COMPRESSION: str = "zstd"
+
+    # WebSocket streaming; "redis" fans events out across workers via REDIS_URL
+    STREAM_BACKEND: str = "local"
+    STREAM_QUEUE_SIZE: int = 256
+    # What to do when a subscriber's queue is full: drop_oldest or disconnect
+    STREAM_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+    # Coalesce token events for up to this many seconds / tokens (0 disables)
+    STREAM_BATCH_WINDOW: float = 0.02
+    STREAM_BATCH_MAX_TOKENS: int = 64
+    # Recent events kept per run for replay to late subscribers
+    STREAM_REPLAY_SIZE: int = 1000
+    STREAM_REPLAY_RUNS: int = 1000
+    # Also keep them in Redis (redis backend only) so any worker can replay
+    STREAM_REPLAY_PERSIST: bool = False
+
+    # LLM providers ("groq", "mock"); the mock streams a deterministic reply
+    # offline at LLM_MOCK_TOKENS_PER_SEC after LLM_MOCK_LATENCY seconds
+    LLM_PROVIDER: str = "groq"
+    LLM_MODEL: str = "llama-3.3-70b-versatile"
+    LLM_TIMEOUT: float = 60.0
+    LLM_MAX_CONCURRENCY: int = 8
+    # Requests per second per provider (0 = unlimited)
+    LLM_RATE_LIMIT: float = 0
+    LLM_RATE_BURST: float = 5
+    # Per-provider overrides of concurrency / rate / burst
+    LLM_PROVIDER_LIMITS: Dict[str, Dict[str, float]] = {}
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 8.0
+    LLM_MOCK_LATENCY: float = 0.2
+    LLM_MOCK_TOKENS_PER_SEC: float = 50.0
+    LLM_MOCK_REPLY_TOKENS: int = 40
+    # Replay identical prompts from cache; LLM_CACHE_BACKEND adds a shared
+    # tier behind the in-memory LRU: "memory" (none), "redis" or "sql"
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_BACKEND: str = "memory"
+    LLM_CACHE_TTL: float = 3600
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+
+    # Chat memory. The history cache is per process: set the thread count to 0
+    # when several API workers serve the same threads
+    CHAT_HISTORY_CACHE_THREADS: int = 1000
+    CHAT_HISTORY_CACHE_MESSAGES: int = 200
+    # Prompt budget for history sent to the LLM; older turns beyond it are
+    # summarized into CHAT_SUMMARY_TOKENS (0 drops them instead)
+    CHAT_CONTEXT_TOKENS: int = 4000
+    CHAT_SUMMARY_TOKENS: int = 300
+    # "turn": one commit per chat turn; "write_behind": turns are buffered
+    # and inserted in batches across threads every CHAT_WRITE_BEHIND_INTERVAL
+    CHAT_PERSIST_MODE: str = "turn"
+    CHAT_WRITE_BEHIND_INTERVAL: float = 0.05
+    CHAT_WRITE_BEHIND_BATCH: int = 500
+    # Failed batch writes before rows are written one by one and failing ones dropped
+    CHAT_WRITE_BEHIND_RETRIES: int = 3
+
+    # Rate limiting per verified JWT subject, else per IP ("memory" or "redis").
+    # Quotas are "N/second|minute|hour|day" or "N/<seconds>s"; route keys are
+    # "METHOD /path/{param}" and the first match wins over the default
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_DEFAULT: Optional[str] = "600/minute"
+    RATE_LIMIT_ROUTES: Dict[str, str] = {
+        "POST /api/runs/": "60/minute",
+        "POST /api/runs/batch": "10/minute",
+        "POST /api/chat/{thread_id}/message": "30/minute",
+    }
+    RATE_LIMIT_EXEMPT: List[str] = ["/health", "/api/monitoring"]
+
+    # JSON access log to stdout; successful requests are sampled at
+    # ACCESS_LOG_SAMPLE_RATE, errors and requests over ACCESS_LOG_SLOW_MS always
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: Optional[float] = 1000
+
+    # Request/queue/stream/DB/LLM metrics at /api/monitoring/metrics
+    METRICS_ENABLED: bool = True
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5
+
+    # Resume runs left in status "running" by a previous process
+    RECOVER_RUNS_ON_STARTUP: bool = True
+
     class Config:
         env_file = ".env"
+        extra = "ignore"
 
 settings = Settings()
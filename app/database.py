@@ -1,10 +1,102 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
+from app.config import settings
+from app.utils.metrics import metrics
 
-DATABASE_URL = "sqlite+aiosqlite:///./test.db"  
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def _normalize_url(url: str) -> URL:
+    # Plain postgres URLs get the async psycopg (v3) driver from requirements
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed
+
+
+def sqlite_pragmas() -> Dict[str, object]:
+    # WAL lets readers run alongside the single writer, and NORMAL sync only
+    # fsyncs at checkpoints; busy_timeout waits for the writer instead of
+    # failing with "database is locked"
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": int(settings.SQLITE_BUSY_TIMEOUT_MS),
+        "cache_size": int(settings.SQLITE_CACHE_SIZE),
+        "temp_store": "MEMORY",
+    }
+
+
+def create_db_engine(url: Optional[str] = None, pragmas: Optional[Dict[str, object]] = None) -> AsyncEngine:
+    """
+    Engine for ``url`` (default: settings.DATABASE_URL). SQLite connections
+    get ``pragmas`` (default: sqlite_pragmas()) as they are opened; other
+    databases get a sized, pre-pinged connection pool.
+    """
+    url = _normalize_url(url or settings.DATABASE_URL)
+    kwargs = {"echo": settings.DB_ECHO}
+    if url.get_backend_name() == "sqlite":
+        database = url.database
+        if database and database != ":memory:":
+            directory = os.path.dirname(database)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            kwargs.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        engine = create_async_engine(url, **kwargs)
+        pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+        return engine
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        **kwargs,
+    )
+
+
+engine = create_db_engine()
+
+
+def _pool_usage() -> Dict[tuple, float]:
+    pool = engine.sync_engine.pool
+    usage = {}
+    for state in ("size", "checkedout", "checkedin", "overflow"):
+        fn = getattr(pool, state, None)
+        if fn is not None:
+            usage[(state,)] = fn()
+    if ("overflow",) in usage:
+        # QueuePool counts up from -pool_size, so an idle pool reads negative
+        usage[("overflow",)] = max(usage[("overflow",)], 0)
+    return usage
+
+metrics.gauge("db_pool_connections", "Database connection pool usage", _pool_usage, ("state",))
+
+_hold_seconds = metrics.histogram(
+    "db_connection_hold_seconds", "How long sessions keep a pooled connection checked out",
+).labels()
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, record, proxy):
+    record.info["checked_out_at"] = time.perf_counter()
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, record):
+    started = record.info.pop("checked_out_at", None)
+    if started is not None:
+        _hold_seconds.observe(time.perf_counter() - started)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 AsyncSessionLocal = async_session
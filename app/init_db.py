@@ -1,12 +1,19 @@
-import asyncio
-from app.database import engine, Base
-from app.models.run import Run
+"""
+Bring the database schema up to date with the Alembic migrations. Run this
+on deploy, before starting the server:
 
-async def init_models():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    python -m app.init_db [revision]
+"""
+import sys
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
 
-    print("Database tables created successfully!")
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+def upgrade(revision: str = "head"):
+    command.upgrade(Config(str(ALEMBIC_INI)), revision)
 
 if __name__ == "__main__":
-    asyncio.run(init_models())
+    upgrade(sys.argv[1] if len(sys.argv) > 1 else "head")
+    print("Database schema is up to date!")
@@ -1,9 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, List, Dict
+from typing import AsyncGenerator, List, Dict, Tuple
 
 class BaseLLM(ABC):
+    # Exceptions worth retrying (connection errors, rate limits, 5xx)
+    retryable: Tuple[type, ...] = ()
+
     @abstractmethod
     async def stream(
         self, history: List[Dict[str, str]]
     ) -> AsyncGenerator[str, None]:
         ...
+
+    @property
+    def params(self) -> Dict:
+        """Model and sampling settings that affect the output."""
+        return {}
+
+    async def aclose(self):
+        pass
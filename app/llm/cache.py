@@ -0,0 +1,199 @@
+"""
+Prompt/response cache for LLM calls.
+
+Keys are a hash of the provider, model, sampling params and normalized
+messages. Responses are stored as the list of streamed tokens, so a hit
+replays the same token stream (and the same WebSocket events) as the
+original call. The in-memory LRU is always consulted first; an optional
+Redis or SQL tier shares entries across workers and restarts.
+"""
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+from sqlalchemy import delete
+from app.database import async_session
+from app.models.llm_cache import LLMCacheEntry
+from app.utils.logger import logger
+from app.config import settings
+from .base import BaseLLM
+
+
+def normalize_messages(history: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """Role and whitespace-collapsed content, so trivially different prompts share a key."""
+    return [(m["role"].strip().lower(), " ".join(m["content"].split())) for m in history]
+
+def cache_key(namespace: str, params: dict, history: List[Dict[str, str]]) -> str:
+    payload = json.dumps(
+        [namespace, params, normalize_messages(history)], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CacheTier(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[List[str]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, tokens: List[str], ttl: float):
+        ...
+
+
+class RedisCacheTier(CacheTier):
+    def __init__(self, client_factory, prefix: str = "llmcache:"):
+        self._client_factory = client_factory
+        self.prefix = prefix
+
+    async def get(self, key):
+        raw = await (await self._client_factory()).get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key, tokens, ttl):
+        client = await self._client_factory()
+        await client.set(self.prefix + key, json.dumps(tokens), ex=max(int(ttl), 1))
+
+
+class SQLCacheTier(CacheTier):
+    """
+    Rows in the ``llm_cache`` table. Expired rows are ignored on read, and
+    writers delete them at most once every ``purge_interval`` seconds.
+    """
+
+    def __init__(self, purge_interval: float = 60.0):
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+
+    async def get(self, key):
+        async with async_session() as db:
+            row = await db.get(LLMCacheEntry, key)
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row.tokens
+
+    async def set(self, key, tokens, ttl):
+        async with async_session() as db:
+            await db.merge(LLMCacheEntry(
+                key=key, tokens=tokens, expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+            ))
+            await db.commit()
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            await self.purge_expired()
+
+    async def purge_expired(self):
+        async with async_session() as db:
+            await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= datetime.utcnow()))
+            await db.commit()
+
+
+class LLMCache:
+    """In-memory LRU with TTL in front of an optional shared tier."""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, tier: Optional[CacheTier] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tier = tier
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self.hits = 0
+        self.tier_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, tokens: List[str], expires: float):
+        self._entries[key] = (expires, tokens)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        if self.tier is not None:
+            try:
+                tokens = await self.tier.get(key)
+            except Exception as e:
+                logger.warning("LLM cache tier read failed: %s", e)
+                tokens = None
+            if tokens is not None:
+                self._remember(key, tokens, time.monotonic() + self.ttl)
+                self.hits += 1
+                self.tier_hits += 1
+                return tokens
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, tokens: List[str]):
+        self._remember(key, tokens, time.monotonic() + self.ttl)
+        if self.tier is not None:
+            try:
+                await self.tier.set(key, tokens, self.ttl)
+            except Exception as e:
+                logger.warning("LLM cache tier write failed: %s", e)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "tier_hits": self.tier_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _create_tier() -> Optional[CacheTier]:
+    if settings.LLM_CACHE_BACKEND == "redis":
+        from app.utils.redis_manager import get_redis
+        return RedisCacheTier(get_redis)
+    if settings.LLM_CACHE_BACKEND == "sql":
+        return SQLCacheTier()
+    return None
+
+
+llm_cache = LLMCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL, _create_tier())
+
+
+class CachedLLM(BaseLLM):
+    """
+    Serves repeated prompts from ``cache``. Misses stream from ``llm`` as
+    usual and are stored once the response completed; partial or failed
+    responses are never cached.
+    """
+
+    def __init__(self, llm: BaseLLM, cache: LLMCache, namespace: str):
+        self.llm = llm
+        self.cache = cache
+        self.namespace = namespace
+
+    @property
+    def params(self):
+        return self.llm.params
+
+    async def stream(
+        self, history: List[Dict[str, str]]
+    ) -> AsyncGenerator[str, None]:
+        key = cache_key(self.namespace, self.params, history)
+        tokens = await self.cache.get(key)
+        if tokens is not None:
+            for token in tokens:
+                yield token
+            return
+        tokens = []
+        async for token in self.llm.stream(history):
+            tokens.append(token)
+            yield token
+        await self.cache.set(key, tokens)
+
+    async def aclose(self):
+        await self.llm.aclose()
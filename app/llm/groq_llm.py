@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+from typing import AsyncGenerator, List, Dict
+from .base import BaseLLM
+
+# Load .env file from project root
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent.parent.parent / '.env'
+    load_dotenv(env_path)
+except Exception:
+    pass  # If dotenv fails, continue with system env vars
+
+try:
+    import groq
+    from groq import AsyncGroq
+    GROQ_AVAILABLE = True
+except ImportError:
+    GROQ_AVAILABLE = False
+
+class GroqLLM(BaseLLM):
+    """LLM implementation using Groq API."""
+
+    def __init__(self, model_name: str = "llama-3.3-70b-versatile", timeout: float = 60.0):
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY environment variable not set")
+
+        if not GROQ_AVAILABLE:
+            raise ImportError("groq package not installed. Run: pip install groq")
+
+        # One client per provider, so every request reuses its HTTP pool.
+        # Retries are done by the provider wrapper, not the SDK.
+        self.client = AsyncGroq(api_key=api_key, timeout=timeout, max_retries=0)
+        self.model_name = model_name
+        self.temperature = 0.7
+        self.max_tokens = 2048
+        self.retryable = (
+            groq.APIConnectionError,
+            groq.RateLimitError,
+            groq.InternalServerError,
+        )
+
+    async def stream(
+        self, history: List[Dict[str, str]]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream responses from Groq API.
+        history = [
+            {"role": "user", "content": "..."},
+            {"role": "assistant", "content": "..."}
+        ]
+        """
+        # Convert history to Groq format
+        messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
+
+        # Stream the response
+        stream = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            stream=True,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    @property
+    def params(self):
+        return {"model": self.model_name, "temperature": self.temperature, "max_tokens": self.max_tokens}
+
+    async def aclose(self):
+        await self.client.close()
+
+# Keep GeminiLLM alias for backward compatibility
+GeminiLLM = GroqLLM
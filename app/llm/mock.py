@@ -1,62 +1,53 @@
-import os
 import asyncio
-from pathlib import Path
+import hashlib
+import random
 from typing import AsyncGenerator, List, Dict
 from .base import BaseLLM
 
-# Load .env file from project root
-try:
-    from dotenv import load_dotenv
-    env_path = Path(__file__).parent.parent.parent.parent / '.env'
-    load_dotenv(env_path)
-except Exception:
-    pass  # If dotenv fails, continue with system env vars
-
-try:
-    from groq import AsyncGroq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
-
-class GroqLLM(BaseLLM):
-    """LLM implementation using Groq API."""
-    
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile"):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable not set")
-        
-        if not GROQ_AVAILABLE:
-            raise ImportError("groq package not installed. Run: pip install groq")
-        
-        self.client = AsyncGroq(api_key=api_key)
-        self.model_name = model_name
+_WORDS = (
+    "the graph runs each node in order and streams every token back to the "
+    "client while state checkpoints keep the workflow resumable after a "
+    "restart so long running agents can pick up where they left off"
+).split()
+
+
+class MockLLM(BaseLLM):
+    """
+    Offline stand-in for a real provider. The reply is derived from a hash
+    of the prompt, so the same history always streams the same tokens, at
+    ``tokens_per_sec`` after ``latency`` seconds to the first token.
+    """
+
+    def __init__(self, latency: float = 0.2, tokens_per_sec: float = 50.0, reply_tokens: int = 40):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+
+    @property
+    def params(self):
+        return {"reply_tokens": self.reply_tokens}
+
+    def reply(self, history: List[Dict[str, str]]) -> List[str]:
+        seed = hashlib.sha256(
+            "\n".join(f"{m['role']}:{m['content']}" for m in history).encode()
+        ).digest()
+        rng = random.Random(seed)
+        return [
+            ("" if i == 0 else " ") + rng.choice(_WORDS)
+            for i in range(self.reply_tokens)
+        ]
 
     async def stream(
         self, history: List[Dict[str, str]]
     ) -> AsyncGenerator[str, None]:
-        """
-        Stream responses from Groq API.
-        history = [
-            {"role": "user", "content": "..."},
-            {"role": "assistant", "content": "..."}
-        ]
-        """
-        # Convert history to Groq format
-        messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
-        
-        # Stream the response
-        stream = await self.client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            stream=True,
-            temperature=0.7,
-            max_tokens=2048
-        )
-        
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-
-# Keep GeminiLLM alias for backward compatibility
-GeminiLLM = GroqLLM
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        delay = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        for i, token in enumerate(self.reply(history)):
+            if i and delay:
+                await asyncio.sleep(delay)
+            yield token
+
+
+# GroqLLM used to live here
+from .groq_llm import GroqLLM, GeminiLLM  # noqa: E402,F401
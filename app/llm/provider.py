@@ -1,3 +1,156 @@
-from .mock import GroqLLM
+import asyncio
+import time
+from typing import AsyncGenerator, Callable, Dict, List, Optional
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from .base import BaseLLM
+from .cache import CachedLLM, llm_cache
+from .limits import TokenBucket, backoff_delay
 
-llm = GroqLLM()
+ttft_seconds = metrics.histogram(
+    "llm_time_to_first_token_seconds", "Time from request to the first streamed token", ("provider",),
+)
+llm_requests = metrics.counter("llm_requests_total", "LLM requests by outcome", ("provider", "outcome"))
+
+
+class ManagedLLM(BaseLLM):
+    """
+    Wraps a provider backend with a concurrency limit, a request rate limit
+    and retries. A request is only retried if it fails before the first
+    token; once tokens reached the caller a retry would repeat them.
+    """
+
+    def __init__(
+        self,
+        backend: BaseLLM,
+        name: str = "llm",
+        concurrency: int = 8,
+        rate: float = 0,
+        burst: float = 1,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+    ):
+        self.backend = backend
+        self.name = name
+        self._ttft = ttft_seconds.labels(name)
+        self.retryable = backend.retryable + (ConnectionError, asyncio.TimeoutError)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+    async def stream(
+        self, history: List[Dict[str, str]]
+    ) -> AsyncGenerator[str, None]:
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                started = False
+                requested = time.perf_counter()
+                try:
+                    async for token in self.backend.stream(history):
+                        if not started:
+                            started = True
+                            self._ttft.observe(time.perf_counter() - requested)
+                        yield token
+                    llm_requests.labels(self.name, "ok").inc()
+                    return
+                except self.retryable as e:
+                    if started or attempt >= self.max_retries:
+                        llm_requests.labels(self.name, "error").inc()
+                        raise
+                    llm_requests.labels(self.name, "retried").inc()
+                    delay = backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+                    logger.warning("LLM request failed (%r), retrying in %.2fs", e, delay)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                except Exception:
+                    llm_requests.labels(self.name, "error").inc()
+                    raise
+
+    @property
+    def params(self):
+        return self.backend.params
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+def _groq() -> BaseLLM:
+    from .groq_llm import GroqLLM
+    return GroqLLM(settings.LLM_MODEL, timeout=settings.LLM_TIMEOUT)
+
+def _mock() -> BaseLLM:
+    from .mock import MockLLM
+    return MockLLM(
+        latency=settings.LLM_MOCK_LATENCY,
+        tokens_per_sec=settings.LLM_MOCK_TOKENS_PER_SEC,
+        reply_tokens=settings.LLM_MOCK_REPLY_TOKENS,
+    )
+
+
+class LLMRegistry:
+    """
+    Named provider factories. Each provider is built on first use and then
+    shared, so its client, connection pool and limits are process-wide.
+    With LLM_CACHE_ENABLED, repeated prompts are answered from ``llm_cache``
+    without taking a concurrency or rate-limit slot.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], BaseLLM]] = {}
+        self._instances: Dict[str, BaseLLM] = {}
+
+    def register(self, name: str, factory: Callable[[], BaseLLM]):
+        self._factories[name] = factory
+        self._instances.pop(name, None)
+
+    def get(self, name: Optional[str] = None) -> BaseLLM:
+        name = name or settings.LLM_PROVIDER
+        instance = self._instances.get(name)
+        if instance is None:
+            if name not in self._factories:
+                raise ValueError(f"Unknown LLM provider: {name}")
+            limits = settings.LLM_PROVIDER_LIMITS.get(name, {})
+            instance = ManagedLLM(
+                self._factories[name](),
+                name=name,
+                concurrency=int(limits.get("concurrency", settings.LLM_MAX_CONCURRENCY)),
+                rate=limits.get("rate", settings.LLM_RATE_LIMIT),
+                burst=limits.get("burst", settings.LLM_RATE_BURST),
+                max_retries=settings.LLM_MAX_RETRIES,
+                retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+                retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+            )
+            if settings.LLM_CACHE_ENABLED:
+                instance = CachedLLM(instance, llm_cache, name)
+            self._instances[name] = instance
+        return instance
+
+    def list(self) -> List[str]:
+        return list(self._factories)
+
+    async def aclose(self):
+        instances, self._instances = self._instances, {}
+        for instance in instances.values():
+            await instance.aclose()
+
+
+llm_registry = LLMRegistry()
+llm_registry.register("groq", _groq)
+llm_registry.register("mock", _mock)
+
+
+class _DefaultLLM(BaseLLM):
+    """The configured provider, resolved on first use rather than at import."""
+
+    def stream(self, history: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+        return llm_registry.get().stream(history)
+
+
+llm = _DefaultLLM()
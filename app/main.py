@@ -4,7 +4,17 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.main import api_router
-from app.database import engine, Base
+from app.config import settings
+from app.services.workflow_service import recover_runs
+from app.utils.task_queue import task_queue
+from app.utils.stream_manager import stream_manager
+from app.services.chat_memory import chat_writer
+from app.llm.provider import llm_registry
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.logging import AccessLogMiddleware, access_log
+from app.middleware.rate_limit import RateLimitMiddleware, create_backend as create_rate_limit_backend
+from app.utils.metrics import loop_lag_monitor
+from app.worker import create_worker
 # Import models to register them with Base.metadata
 import app.models
 
@@ -18,20 +28,70 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Inside CORS so 429 responses still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=create_rate_limit_backend(),
+        default=settings.RATE_LIMIT_DEFAULT,
+        routes=settings.RATE_LIMIT_ROUTES,
+        exempt=settings.RATE_LIMIT_EXEMPT,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "Retry-After",
+        "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy",
+    ],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.ACCESS_LOG_ENABLED:
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_ms=settings.ACCESS_LOG_SLOW_MS,
+    )
+
 app.include_router(api_router, prefix="/api")
 
+# Runs workflow jobs in this process; set JOB_WORKER_IN_API=false when
+# separate `python -m app.worker` processes do that
+api_worker = create_worker() if settings.JOB_WORKER_IN_API else None
+
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if settings.ACCESS_LOG_ENABLED:
+        access_log.start()
+    if settings.METRICS_ENABLED:
+        loop_lag_monitor.interval = settings.METRICS_LOOP_LAG_INTERVAL
+        loop_lag_monitor.start()
+    await stream_manager.start()
+    task_queue.start()
+    if settings.CHAT_PERSIST_MODE == "write_behind":
+        chat_writer.start()
+    if settings.RECOVER_RUNS_ON_STARTUP:
+        await recover_runs()
+    if api_worker:
+        api_worker.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if api_worker:
+        await api_worker.stop(settings.JOB_SHUTDOWN_TIMEOUT)
+    await task_queue.stop()
+    await chat_writer.stop()
+    await llm_registry.aclose()
+    await stream_manager.stop()
+    await loop_lag_monitor.stop()
+    access_log.stop()
 
 @app.get("/health")
 async def health_check():
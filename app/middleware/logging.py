@@ -1,13 +1,126 @@
+"""
+Structured access logging as pure ASGI middleware.
+
+One JSON record per request. The event loop only builds a dict and puts
+a log record on a queue; a QueueListener thread formats and writes it,
+so slow stdout or disk never stalls request handling.
+"""
+import json
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.middleware.metrics import route_template
+
+access_logger = logging.getLogger("langgraph-fastapi.access")
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
 
 def setup_logging():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logging.info(f"Incoming: {request.method} {request.url}")
-        resp = await call_next(request)
-        logging.info(f"Response: {resp.status_code} {request.url}")
-        return resp
+
+class JsonFormatter(logging.Formatter):
+    """Writes the record's ``access`` dict (or its message) as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = getattr(record, "access", None)
+        if data is None:
+            data = {"level": record.levelname, "message": record.getMessage()}
+        ts = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
+        return json.dumps({"ts": ts, **data}, separators=(",", ":"), default=str)
+
+
+class _RecordQueueHandler(QueueHandler):
+    # The stock prepare() formats and copies every record on the caller's
+    # thread; access records need neither, the listener formats them
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class AccessLog:
+    """Owns the queue and the listener thread that writes access records."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._listener: Optional[QueueListener] = None
+        self._handler: Optional[QueueHandler] = None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        records = queue.SimpleQueue()
+        output = logging.StreamHandler(self.stream or sys.stdout)
+        output.setFormatter(JsonFormatter())
+        self._handler = _RecordQueueHandler(records)
+        access_logger.addHandler(self._handler)
+        self._listener = QueueListener(records, output, respect_handler_level=False)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        if self._listener is None:
+            return
+        access_logger.removeHandler(self._handler)
+        self._listener.stop()
+        self._listener = None
+        self._handler = None
+
+
+access_log = AccessLog()
+
+
+class AccessLogMiddleware:
+    """
+    Logs method, route, status, duration and response size per request.
+    Successful requests are logged with probability ``sample_rate``;
+    errors (status >= 400) and requests slower than ``slow_ms`` always are.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, slow_ms: Optional[float] = None):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if (
+                status >= 400
+                or (self.slow_ms is not None and duration_ms >= self.slow_ms)
+                or self.sample_rate >= 1
+                or random.random() < self.sample_rate
+            ):
+                client = scope.get("client")
+                access_logger.info("request", extra={"access": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_template(scope),
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                    "bytes": size,
+                    "client": client[0] if client else None,
+                }})
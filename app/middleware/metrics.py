@@ -0,0 +1,46 @@
+import time
+from app.utils.metrics import metrics
+
+request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+
+
+def route_template(scope) -> str:
+    """Full path template of the route that handled the request."""
+    # Routers included into routers are resolved lazily by newer FastAPI,
+    # which leaves the prefixed template in its own scope entry
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing HTTP requests. Requests are labelled with the
+    matched route template (``/api/runs/{run_id}``), not the raw path, so
+    label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_seconds.labels(scope["method"], route_template(scope), str(status)).observe(time.perf_counter() - started)
@@ -1,10 +1,232 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Response, status
+"""
+Per-client rate limiting as pure ASGI middleware.
 
-class SimpleRateLimit(BaseHTTPMiddleware):
-    # naive demo: block everything when header 'X-Block' present
-    async def dispatch(self, request, call_next):
-        if request.headers.get("x-block"):
-            return Response("Rate limited", status_code=status.HTTP_429_TOO_MANY_REQUESTS)
-        return await call_next(request)
+Limits use GCRA (the generic cell rate algorithm, equivalent to a token
+bucket that holds ``limit`` tokens and refills over ``period``). Each
+client and rule keeps only a "theoretical arrival time", so a check is
+O(1). Clients are identified by JWT subject when their token has already
+been verified (see app.auth.cached_claims), otherwise by IP: anything a
+client could make up per request, like an unverified token or API key,
+would hand it a fresh bucket every time.
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from starlette.routing import compile_path
+from app.auth import cached_claims
+from app.config import settings
+from app.utils.logger import logger
 
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_quota(spec: str) -> Tuple[int, float]:
+    """``"30/minute"`` or ``"5/10s"`` -> ``(limit, period_seconds)``."""
+    count, _, per = spec.partition("/")
+    per = per.strip().lower()
+    if per in _PERIODS:
+        period = _PERIODS[per]
+    elif per.endswith("s") and per[:-1].replace(".", "", 1).isdigit():
+        period = float(per[:-1])
+    else:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return int(count), float(period)
+
+
+class Decision:
+    __slots__ = ("allowed", "limit", "remaining", "reset", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+def _decide(allowed: bool, limit: int, period: float, tat: float, now: float) -> Decision:
+    """Build a decision from the theoretical arrival time after this request."""
+    interval = period / limit
+    if not allowed:
+        # tat is unchanged; the next request fits once now reaches tat + interval - period
+        return Decision(False, limit, 0, tat - now, max(tat + interval - period - now, 0.0))
+    remaining = int((period - (tat - now)) // interval)
+    return Decision(True, limit, max(remaining, 0), tat - now, 0.0)
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, period: float) -> Decision:
+        ...
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process GCRA state. Idle keys are evicted a few at a time as requests come in."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+    async def hit(self, key, limit, period):
+        now = time.monotonic()
+        interval = period / limit
+        tat = max(self._tat.get(key, now), now)
+        allowed = tat + interval - period <= now
+        if allowed:
+            tat += interval
+            self._tat[key] = tat
+            self._tat.move_to_end(key)
+        self._evict(now)
+        return _decide(allowed, limit, period, tat, now)
+
+    def _evict(self, now: float):
+        # Least recently used first; an entry whose tat has passed is a full bucket
+        for _ in range(2):
+            if not self._tat:
+                return
+            key, tat = next(iter(self._tat.items()))
+            if tat > now and len(self._tat) <= self.max_keys:
+                return
+            del self._tat[key]
+
+
+# KEYS[1] = bucket; ARGV = interval, period. Uses the server clock so every
+# worker agrees on "now"; returns {allowed, tat - now} as strings to keep
+# the fractional seconds.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat + interval - period > now then
+  return {0, tostring(tat - now)}
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+return {1, tostring(tat - now)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """GCRA state in Redis, updated by one atomic script so limits hold across workers."""
+
+    def __init__(self, client_factory, prefix: str = "ratelimit:"):
+        self._client_factory = client_factory
+        self.prefix = prefix
+        self._script = None
+
+    async def hit(self, key, limit, period):
+        if self._script is None:
+            self._script = (await self._client_factory()).register_script(_GCRA_LUA)
+        allowed, ahead = await self._script(keys=[self.prefix + key], args=[period / limit, period])
+        # Reconstruct relative to a local "now" of 0
+        return _decide(bool(int(allowed)), limit, period, float(ahead), 0.0)
+
+
+class _Rule:
+    __slots__ = ("name", "method", "regex", "limit", "period", "policy")
+
+    def __init__(self, name: str, spec: str):
+        self.name = name
+        method, _, path = name.partition(" ") if " " in name else ("*", "", name)
+        self.method = method.upper()
+        self.regex = compile_path(path)[0]
+        self.limit, self.period = parse_quota(spec)
+        self.policy = f"{self.limit};w={int(self.period)}"
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method == "*" or self.method == method) and self.regex.match(path) is not None
+
+
+def client_identity(scope) -> str:
+    """``sub:<subject>`` for a bearer token verified by an earlier request, else ``ip:<address>``."""
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            auth = value.decode("latin-1")
+            if auth[:7].lower() == "bearer ":
+                claims = cached_claims(auth[7:].strip())
+                if claims and claims.get("sub") is not None:
+                    return f"sub:{claims['sub']}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Applies the first rule in ``routes`` matching the request (``"POST
+    /api/runs/"`` style keys, ``{param}`` placeholders allowed), else
+    ``default``. Responses carry ``RateLimit-*`` headers; rejected requests
+    get 429 with ``Retry-After``. If the backend fails, requests are let
+    through rather than taking the API down with it.
+    """
+
+    def __init__(self, app, backend: RateLimitBackend, default: Optional[str] = None,
+                 routes: Optional[Dict[str, str]] = None, exempt: Optional[List[str]] = None):
+        self.app = app
+        self.backend = backend
+        self.rules = [_Rule(name, spec) for name, spec in (routes or {}).items()]
+        self.default = _Rule("*", default) if default else None
+        self.exempt = tuple(exempt or ())
+
+    def _rule(self, method: str, path: str) -> Optional[_Rule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return self.default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+        rule = self._rule(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            decision = await self.backend.hit(f"{rule.name}|{client_identity(scope)}", rule.limit, rule.period)
+        except Exception as e:
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            await self.app(scope, receive, send)
+            return
+
+        headers = [
+            (b"ratelimit-limit", str(decision.limit).encode()),
+            (b"ratelimit-remaining", str(decision.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(decision.reset)).encode()),
+            (b"ratelimit-policy", rule.policy.encode()),
+        ]
+        if not decision.allowed:
+            body = b'{"detail":"Rate limit exceeded"}'
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"retry-after", str(max(1, math.ceil(decision.retry_after))).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", ())) + headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from app.utils.redis_manager import get_redis
+        return RedisRateLimitBackend(get_redis)
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
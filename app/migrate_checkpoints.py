@@ -0,0 +1,50 @@
+"""
+Import legacy ``data/checkpoints/<run_id>__<step>.json`` and
+``data/states/<run_id>__<ts>.json`` files into the configured checkpoint store.
+
+    python -m app.migrate_checkpoints [--backend sql|log] [--data-dir data]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+from app.init_db import upgrade
+from app.services.checkpoint_backends import create_checkpoint_store
+
+
+def _legacy_records(directory: str, kind: str):
+    if not os.path.isdir(directory):
+        return []
+    records = []
+    for fname in os.listdir(directory):
+        if not fname.endswith(".json") or "__" not in fname:
+            continue
+        run_id, step = fname[:-len(".json")].rsplit("__", 1)
+        with open(os.path.join(directory, fname)) as f:
+            body = json.load(f)
+        ts = datetime.datetime.fromisoformat(body["ts"]) if body.get("ts") else None
+        records.append((ts or datetime.datetime.min, kind, run_id, body.get("step", step), body["state"]))
+    return records
+
+
+async def migrate(backend: str = None, data_dir: str = "data") -> int:
+    # Alembic runs its own event loop, so migrate from a thread
+    await asyncio.to_thread(upgrade)
+    store = create_checkpoint_store(backend)
+    records = _legacy_records(os.path.join(data_dir, "checkpoints"), "checkpoint")
+    records += _legacy_records(os.path.join(data_dir, "states"), "state")
+    # Oldest first so the newest legacy file becomes the latest record
+    records.sort(key=lambda r: r[0])
+    for ts, kind, run_id, step, state in records:
+        await store.put(kind, run_id, step, state, ts=None if ts == datetime.datetime.min else ts)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["sql", "log"], default=None)
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+    count = asyncio.run(migrate(args.backend, args.data_dir))
+    print(f"Imported {count} checkpoint/state records")
@@ -2,3 +2,7 @@ from .run import Run
 from .chat_message import ChatMessage
 from .chat_thread import ChatThread
 from .user_model import User
+from .checkpoint import Checkpoint
+from .artifact import Artifact, ArtifactBlob
+from .llm_cache import LLMCacheEntry
+from .job import Job
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, Integer, ForeignKey, Index
+from datetime import datetime
+from app.database import Base
+
+class ArtifactBlob(Base):
+    """Content-addressed blob shared by every artifact with the same bytes."""
+    __tablename__ = "artifact_blobs"
+
+    hash = Column(String, primary_key=True)  # sha256 hex of the uncompressed bytes
+    size = Column(BigInteger, nullable=False)
+    stored_size = Column(BigInteger, nullable=False)
+    encoding = Column(String, nullable=True)  # None / gzip / zstd
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Artifact(Base):
+    __tablename__ = "artifacts"
+    __table_args__ = (
+        Index("ix_artifacts_run_id_created_at", "run_id", "created_at"),
+    )
+
+    id = Column(String, primary_key=True)  # artifact_id, also the file name on disk
+    run_id = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    checksum = Column(String, nullable=True)  # sha256 hex
+    # Set when the bytes live in the blob store instead of data/artifacts/<id>
+    blob = Column(String, ForeignKey("artifact_blobs.hash"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
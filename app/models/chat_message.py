@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 import uuid
@@ -11,3 +11,7 @@ class ChatMessage(Base):
     role = Column(String)  # user / assistant / system
     content = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_messages_thread_id_created_at", "thread_id", "created_at"),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class Checkpoint(Base):
+    __tablename__ = "checkpoints"
+    __table_args__ = (
+        # latest-per-run (ORDER BY id DESC LIMIT 1) and by-step lookups
+        Index("ix_checkpoints_kind_run_id_id", "kind", "run_id", "id"),
+        Index("ix_checkpoints_kind_run_id_step", "kind", "run_id", "step"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # checkpoint / state
+    run_id = Column(String, nullable=False)
+    step = Column(String, nullable=False)
+    ts = Column(DateTime, default=datetime.utcnow)
+    data = Column(JSON, nullable=True)
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, DateTime, Text, JSON, Index, Integer, Float, text
+from app.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming scans queued jobs by due time and leased ones by expiry
+        Index("ix_jobs_status_available_at", "status", "available_at"),
+        # Claim order within the due jobs, and each tenant's latest fair tag
+        Index("ix_jobs_status_priority_fair_at", "status", "priority", "fair_at"),
+        Index("ix_jobs_tenant_fair_at", "tenant", "fair_at"),
+        # At most one queued or leased job per dedupe key
+        Index(
+            "uq_jobs_active_key", "key", unique=True,
+            sqlite_where=text("status IN ('queued', 'leased')"),
+            postgresql_where=text("status IN ('queued', 'leased')"),
+        ),
+    )
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    key = Column(String, nullable=True)
+    # Index into task_queue.LANES (0 = interactive); lower runs first
+    priority = Column(Integer, nullable=False, default=1, server_default="1")
+    tenant = Column(String, nullable=False, default="default", server_default="default")
+    # Virtual finish time for fair queuing across tenants within a lane
+    fair_at = Column(Float, nullable=False, default=0.0, server_default="0")
+    payload = Column(JSON, nullable=False)
+    # queued -> leased -> (deleted when done) | queued again (retry) | dead
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Epoch seconds, so due/expired checks are plain numeric comparisons
+    available_at = Column(Float, nullable=False)
+    lease_token = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    worker = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from app.database import Base
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of model, params and messages
+    tokens = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
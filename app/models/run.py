@@ -1,15 +1,27 @@
-from sqlalchemy import Column, String, DateTime, Text, JSON
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, DateTime, Text, JSON, Index, Integer
 from sqlalchemy.sql import func
 from app.database import Base
 
 class Run(Base):
     __tablename__ = "runs"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Keyset listing, newest first, optionally filtered by status
+        Index("ix_runs_created_at_id", "created_at", "id"),
+        Index("ix_runs_status_created_at", "status", "created_at"),
+        {'extend_existing': True},
+    )
 
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     status = Column(String, nullable=False, default="running")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side too: SQLite's CURRENT_TIMESTAMP is second-precision text
+    # in another format than bound datetimes, which breaks cursor comparisons
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     run_meta = Column(JSON, nullable=True)
     result = Column(JSON, nullable=True)
+    # Progress, updated as each graph node finishes
+    current_node = Column(String, nullable=True)
+    node_status = Column(String, nullable=True)
+    nodes_completed = Column(Integer, nullable=False, default=0, server_default="0")
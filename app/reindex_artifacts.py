@@ -0,0 +1,60 @@
+"""
+Build the artifact metadata index from files already in data/artifacts.
+
+    python -m app.reindex_artifacts
+"""
+import asyncio
+import hashlib
+import mimetypes
+import os
+from datetime import datetime
+from sqlalchemy import select
+from app.database import async_session
+from app.init_db import upgrade
+from app.models.artifact import Artifact
+from app.services.artifact_store import BASE
+
+BATCH = 500
+
+
+def _describe(fname: str) -> dict:
+    path = os.path.join(BASE, fname)
+    # artifact ids are "<run_id>_<uuid hex>_<filename>"; run ids contain no "_"
+    parts = fname.split("_", 2)
+    filename = parts[2] if len(parts) > 2 else fname
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    st = os.stat(path)
+    return {
+        "id": fname,
+        "run_id": parts[0],
+        "filename": filename,
+        "size": st.st_size,
+        "content_type": mimetypes.guess_type(filename)[0],
+        "checksum": digest.hexdigest(),
+        "created_at": datetime.utcfromtimestamp(st.st_ctime),
+    }
+
+
+async def reindex() -> int:
+    # Alembic runs its own event loop, so migrate from a thread
+    await asyncio.to_thread(upgrade)
+    async with async_session() as db:
+        known = set((await db.execute(select(Artifact.id))).scalars().all())
+    names = [
+        f for f in os.listdir(BASE)
+        if f not in known and not f.endswith(".tmp") and os.path.isfile(os.path.join(BASE, f))
+    ]
+    for i in range(0, len(names), BATCH):
+        rows = await asyncio.to_thread(lambda b: [_describe(f) for f in b], names[i:i + BATCH])
+        async with async_session() as db:
+            db.add_all([Artifact(**r) for r in rows])
+            await db.commit()
+    return len(names)
+
+
+if __name__ == "__main__":
+    count = asyncio.run(reindex())
+    print(f"Indexed {count} artifacts")
@@ -1,40 +1,178 @@
-import os, uuid
+import os, uuid, asyncio, mimetypes
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterable, Optional
+from sqlalchemy import select, update, delete, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import settings
+from app.database import async_session
+from app.models.artifact import Artifact, ArtifactBlob
+from app.services.blob_store import BlobStore
+from app.utils.aio_files import atomic_write_stream
+from app.utils.pagination import encode_cursor, decode_cursor
 BASE = os.path.join("data", "artifacts")
 os.makedirs(BASE, exist_ok=True)
 
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+async def _one_chunk(data: bytes):
+    yield data
+
+
 class ArtifactService:
-    def save_bytes(self, run_id: str, filename: str, data: bytes) -> str:
+    """
+    Stores artifacts either as one file per artifact under data/artifacts
+    ("plain") or deduplicated in the content-addressed blob store ("cas"),
+    selected by ``settings.ARTIFACT_STORAGE``. Metadata for both lives in the
+    artifacts table.
+
+    Blob refcounts change only through single statements (an upsert, a
+    conditional delete), so several processes can share the blob store.
+    """
+
+    def __init__(self, storage: str = "cas", compression: str = "zstd"):
+        self.storage = storage
+        self.blobs = BlobStore(compression=compression)
+
+    @staticmethod
+    def _to_dict(row: Artifact) -> dict:
+        return {
+            "artifact_id": row.id,
+            "filename": row.filename,
+            "size": row.size,
+            "content_type": row.content_type,
+            "sha256": row.checksum,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+
+    async def save_bytes_async(self, run_id: str, filename: str, data: bytes) -> str:
+        """Write an artifact off the event loop, atomically, and index it."""
+        return (await self.save_stream(run_id, filename, _one_chunk(data)))["artifact_id"]
+
+    async def save_stream(
+        self, run_id: str, filename: str, chunks: AsyncIterable[bytes],
+        max_size: Optional[int] = None, content_type: Optional[str] = None,
+    ) -> dict:
+        """Stream an artifact to storage chunk by chunk and index it."""
+        filename = os.path.basename(filename)
+        content_type = content_type or mimetypes.guess_type(filename)[0]
         aid = f"{run_id}_{uuid.uuid4().hex}_{filename}"
-        path = os.path.join(BASE, aid)
-        with open(path, "wb") as f:
-            f.write(data)
-        return aid
-
-    def get_path(self, artifact_id: str) -> str:
-        p = os.path.join(BASE, artifact_id)
-        return p if os.path.exists(p) else None
-    
-    def list_by_run(self, run_id: str) -> list:
-        """List all artifacts for a specific run"""
-        artifacts = []
-        if not os.path.exists(BASE):
-            return artifacts
-        
-        for filename in os.listdir(BASE):
-            if filename.startswith(f"{run_id}_"):
-                # Extract original filename from artifact_id format: run_id_uuid_filename
-                parts = filename.split("_", 2)
-                original_name = parts[2] if len(parts) > 2 else filename
-                file_path = os.path.join(BASE, filename)
-                artifacts.append({
-                    "artifact_id": filename,
-                    "filename": original_name,
-                    "size": os.path.getsize(file_path),
-                    "created_at": os.path.getctime(file_path)
-                })
-        
-        # Sort by creation time, newest first
-        artifacts.sort(key=lambda x: x["created_at"], reverse=True)
-        return artifacts
-
-artifact_service = ArtifactService()
+        row = Artifact(id=aid, run_id=run_id, filename=filename, content_type=content_type)
+
+        if self.storage != "cas":
+            row.size, row.checksum = await atomic_write_stream(os.path.join(BASE, aid), chunks, max_size)
+            async with async_session() as db:
+                db.add(row)
+                await db.commit()
+            return self._to_dict(row)
+
+        staged = await self.blobs.stage(chunks, content_type, max_size)
+        row.size, row.checksum, row.blob = staged.size, staged.sha256, staged.sha256
+        try:
+            async with async_session() as db:
+                insert = _UPSERT_DIALECTS[db.bind.dialect.name](ArtifactBlob).values(
+                    hash=staged.sha256, size=staged.size, stored_size=staged.stored_size,
+                    encoding=staged.encoding, refcount=1,
+                )
+                # A blob stored earlier keeps its encoding, which may differ from the staged one
+                encoding = (await db.execute(
+                    insert.on_conflict_do_update(
+                        index_elements=[ArtifactBlob.hash],
+                        set_={"refcount": ArtifactBlob.refcount + 1},
+                    ).returning(ArtifactBlob.encoding)
+                )).scalar_one()
+                db.add(row)
+                await db.commit()
+            await self.blobs.commit(staged, encoding)
+        except BaseException:
+            await self.blobs.discard(staged.tmp)
+            raise
+        return self._to_dict(row)
+
+    async def resolve(self, artifact_id: str) -> Optional[dict]:
+        """Where and how an artifact's bytes are stored, or None if unknown."""
+        async with async_session() as db:
+            found = (await db.execute(
+                select(Artifact, ArtifactBlob)
+                .outerjoin(ArtifactBlob, Artifact.blob == ArtifactBlob.hash)
+                .where(Artifact.id == artifact_id)
+            )).first()
+        if found is None:
+            # Not indexed yet (see app.reindex_artifacts); serve the plain file if present
+            path = os.path.join(BASE, artifact_id)
+            if not os.path.exists(path):
+                return None
+            return {"path": path, "encoding": None, "sha256": None, "size": None,
+                    "content_type": mimetypes.guess_type(artifact_id)[0]}
+        row, blob = found
+        if blob is not None:
+            path, encoding = self.blobs.path(blob.hash, blob.encoding), blob.encoding
+        else:
+            path, encoding = os.path.join(BASE, row.id), None
+        if not os.path.exists(path):
+            return None
+        return {"path": path, "encoding": encoding, "sha256": row.checksum, "size": row.size,
+                "content_type": row.content_type}
+
+    async def delete_by_run(self, run_id: str) -> int:
+        """
+        Drop a run's artifacts. Blobs are reference counted and removed from
+        disk once no artifact points at them.
+        """
+        async with async_session() as db:
+            rows = (await db.execute(select(Artifact).where(Artifact.run_id == run_id))).scalars().all()
+            refs = Counter(r.blob for r in rows if r.blob)
+            for blob_hash, n in refs.items():
+                await db.execute(
+                    update(ArtifactBlob)
+                    .where(ArtifactBlob.hash == blob_hash)
+                    .values(refcount=ArtifactBlob.refcount - n)
+                )
+            await db.execute(delete(Artifact).where(Artifact.run_id == run_id))
+            # Only rows this statement removes are ours to unlink
+            dead = (await db.execute(
+                delete(ArtifactBlob)
+                .where(ArtifactBlob.hash.in_(list(refs)), ArtifactBlob.refcount <= 0)
+                .returning(ArtifactBlob.hash, ArtifactBlob.encoding)
+            )).all()
+            # Move the files aside before committing. An upload of the same
+            # content blocks on these rows until the commit, then stores its
+            # own copy, which a later unlink would otherwise remove.
+            detached = [await self.blobs.detach(blob_hash, encoding) for blob_hash, encoding in dead]
+            try:
+                await db.commit()
+            except BaseException:
+                for (blob_hash, encoding), tmp in zip(dead, detached):
+                    await self.blobs.restore(tmp, blob_hash, encoding)
+                raise
+        for tmp in detached:
+            await self.blobs.discard(tmp)
+        for r in rows:
+            if not r.blob and os.path.exists(os.path.join(BASE, r.id)):
+                await asyncio.to_thread(os.remove, os.path.join(BASE, r.id))
+        return len(rows)
+
+    async def list_by_run(self, run_id: str, limit: int = 100, cursor: Optional[str] = None) -> dict:
+        """
+        List artifacts for a run from the metadata index, newest first.
+        Returns ``{"artifacts": [...], "next_cursor": str | None}``.
+        """
+        stmt = select(Artifact).where(Artifact.run_id == run_id)
+        if cursor:
+            created_at, aid = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+            stmt = stmt.where(or_(
+                Artifact.created_at < created_at,
+                and_(Artifact.created_at == created_at, Artifact.id < aid),
+            ))
+        stmt = stmt.order_by(Artifact.created_at.desc(), Artifact.id.desc()).limit(limit + 1)
+        async with async_session() as db:
+            rows = (await db.execute(stmt)).scalars().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return {"artifacts": [self._to_dict(r) for r in rows], "next_cursor": next_cursor}
+
+artifact_service = ArtifactService(settings.ARTIFACT_STORAGE, settings.ARTIFACT_COMPRESSION)
@@ -0,0 +1,168 @@
+"""
+Content-addressed blob storage for artifacts.
+
+Blobs live at ``data/blobs/<hash[:2]>/<sha256>`` (plus ``.gz`` / ``.zst`` when
+compressed) so identical content is stored once no matter how many runs
+reference it. Compressible content types are compressed as they stream in.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+import zlib
+from typing import AsyncIterable, AsyncIterator, Optional
+import aiofiles
+import aiofiles.os
+from app.utils.aio_files import FileTooLarge
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+BASE = os.path.join("data", "blobs")
+os.makedirs(BASE, exist_ok=True)
+
+EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+_COMPRESSIBLE_TYPES = {
+    "application/json", "application/xml", "application/javascript",
+    "application/x-ndjson", "application/yaml", "application/x-yaml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.split(";")[0].strip().lower()
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE_TYPES
+
+
+def _compressor(encoding: Optional[str]):
+    if encoding == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return None
+
+
+def _decompressor(encoding: Optional[str]):
+    if encoding == "gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+class BlobWrite:
+    """Result of staging a blob: hash, sizes and the temp file to commit."""
+
+    def __init__(self, sha256: str, size: int, stored_size: int, encoding: Optional[str], tmp: str):
+        self.sha256 = sha256
+        self.size = size
+        self.stored_size = stored_size
+        self.encoding = encoding
+        self.tmp = tmp
+
+
+class BlobStore:
+    def __init__(self, base: str = BASE, compression: str = "zstd"):
+        self.base = base
+        # Fall back to gzip when the optional zstandard package is missing
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            compression = "gzip"
+        self.compression = None if compression == "none" else compression
+
+    def path(self, sha256: str, encoding: Optional[str]) -> str:
+        return os.path.join(self.base, sha256[:2], sha256 + EXTENSIONS[encoding])
+
+    async def stage(
+        self, chunks: AsyncIterable[bytes], content_type: Optional[str] = None, max_size: Optional[int] = None
+    ) -> BlobWrite:
+        """
+        Stream ``chunks`` into a temp file, hashing the raw bytes and
+        compressing them if the content type is compressible. The caller
+        either commits the result into place or discards it.
+        """
+        encoding = self.compression if is_compressible(content_type) else None
+        comp = _compressor(encoding)
+        tmp = os.path.join(self.base, f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = stored = 0
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLarge(max_size)
+                    digest.update(chunk)
+                    if comp is not None:
+                        chunk = await asyncio.to_thread(comp.compress, chunk)
+                    stored += len(chunk)
+                    await f.write(chunk)
+                if comp is not None:
+                    tail = comp.flush()
+                    stored += len(tail)
+                    await f.write(tail)
+                await f.flush()
+                await aiofiles.os.wrap(os.fsync)(f.fileno())
+        except BaseException:
+            await self.discard(tmp)
+            raise
+        return BlobWrite(digest.hexdigest(), size, stored, encoding, tmp)
+
+    async def commit(self, staged: BlobWrite, encoding: Optional[str]) -> str:
+        """
+        Move a staged blob into place, or drop it if the blob is already
+        stored (with ``encoding``, which may differ from the staged one).
+        """
+        final = self.path(staged.sha256, encoding)
+        if encoding == staged.encoding and not await aiofiles.os.path.exists(final):
+            await aiofiles.os.makedirs(os.path.dirname(final), exist_ok=True)
+            await aiofiles.os.replace(staged.tmp, final)
+        else:
+            await self.discard(staged.tmp)
+        return final
+
+    async def discard(self, tmp: str):
+        if await aiofiles.os.path.exists(tmp):
+            await aiofiles.os.remove(tmp)
+
+    async def detach(self, sha256: str, encoding: Optional[str]) -> str:
+        """Move a blob out of place; discard() or restore() the returned path."""
+        path = self.path(sha256, encoding)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            await aiofiles.os.replace(path, tmp)
+        except FileNotFoundError:
+            pass
+        return tmp
+
+    async def restore(self, tmp: str, sha256: str, encoding: Optional[str]):
+        if await aiofiles.os.path.exists(tmp):
+            await aiofiles.os.replace(tmp, self.path(sha256, encoding))
+
+    async def iter_decoded(self, sha256: str, encoding: Optional[str], chunk_size: int,
+                           start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Yield bytes ``start..end`` (inclusive) of the original (decompressed)
+        blob. A compressed blob cannot seek, so everything before ``start``
+        is decoded and dropped.
+        """
+        decomp = _decompressor(encoding)
+        offset = 0
+        async with aiofiles.open(self.path(sha256, encoding), "rb") as f:
+            while chunk := await f.read(chunk_size):
+                if decomp is not None:
+                    chunk = await asyncio.to_thread(decomp.decompress, chunk)
+                first, offset = offset, offset + len(chunk)
+                if offset <= start:
+                    continue
+                chunk = chunk[max(start - first, 0):]
+                if end is not None and offset > end:
+                    yield chunk[:end + 1 - max(first, start)]
+                    return
+                if chunk:
+                    yield chunk
@@ -0,0 +1,54 @@
+from typing import Dict, List
+
+# Rough average for English text with BPE tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message: Dict[str, str]) -> int:
+    return len(message["content"]) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_turns(messages: List[Dict[str, str]], budget: int) -> str:
+    """
+    Extractive summary of older turns: the opening of each message, newest
+    kept first, within ``budget`` tokens.
+    """
+    lines = []
+    remaining = budget * CHARS_PER_TOKEN
+    for m in reversed(messages):
+        first = m["content"].strip().split("\n", 1)[0][:200]
+        line = f"- {m['role']}: {first}"
+        if len(line) > remaining:
+            break
+        lines.append(line)
+        remaining -= len(line) + 1
+    return "\n".join(reversed(lines))
+
+
+def build_context_window(
+    history: List[Dict[str, str]], max_tokens: int, summary_tokens: int = 0
+) -> List[Dict[str, str]]:
+    """
+    Newest messages of ``history`` that fit in ``max_tokens``. When older
+    messages are cut and ``summary_tokens`` > 0, they are replaced by a
+    system message summarizing them (taken out of the same budget).
+    """
+    budget = max_tokens - (summary_tokens if summary_tokens else 0)
+    window: List[Dict[str, str]] = []
+    used = 0
+    for m in reversed(history):
+        cost = estimate_tokens(m)
+        # Always keep the latest message, even if it alone exceeds the budget
+        if window and used + cost > budget:
+            break
+        window.append(m)
+        used += cost
+    window.reverse()
+
+    dropped = history[:len(history) - len(window)]
+    if dropped and summary_tokens:
+        summary = summarize_turns(dropped, summary_tokens)
+        if summary:
+            window.insert(0, {"role": "system", "content": f"Summary of earlier conversation:\n{summary}"})
+    return window
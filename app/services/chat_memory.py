@@ -1,34 +1,264 @@
-from sqlalchemy import select
+import asyncio
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import select, insert, and_, or_
+from app.config import settings
 from app.models.chat_message import ChatMessage
 from app.database import AsyncSessionLocal
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.logger import logger
 
-async def save_user_message(thread_id: str, content: str):
-    async with AsyncSessionLocal() as db:
-        db.add(ChatMessage(
-            thread_id=thread_id,
-            role="user",
-            content=content
-        ))
-        await db.commit()
 
-async def save_assistant_message(thread_id: str, content: str):
-    async with AsyncSessionLocal() as db:
-        db.add(ChatMessage(
-            thread_id=thread_id,
-            role="assistant",
-            content=content
-        ))
-        await db.commit()
+class HistoryCache:
+    """
+    LRU of the most recent messages of active threads. Threads are loaded
+    from the database once and then kept current by ChatTurn, so a chat
+    turn does not re-read the whole thread.
+
+    The cache is per process and only sees turns handled by this process.
+    With several API workers, a thread whose turns land on different
+    workers reads stale history; set CHAT_HISTORY_CACHE_THREADS=0 there.
+    """
+
+    def __init__(self, max_threads: int = 1000, max_messages: int = 200):
+        self.max_threads = max_threads
+        self.max_messages = max_messages
+        self._threads: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+
+    def get(self, thread_id: str) -> Optional[List[Dict[str, str]]]:
+        messages = self._threads.get(thread_id)
+        if messages is None:
+            return None
+        self._threads.move_to_end(thread_id)
+        return list(messages)
+
+    def put(self, thread_id: str, messages: List[Dict[str, str]]):
+        self._threads[thread_id] = deque(messages, maxlen=self.max_messages)
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+    def append(self, thread_id: str, message: Dict[str, str]):
+        # Threads that are not cached get loaded in full on their next read
+        messages = self._threads.get(thread_id)
+        if messages is not None:
+            messages.append(message)
+
+    def discard(self, thread_id: str):
+        self._threads.pop(thread_id, None)
+
+
+history_cache = HistoryCache(settings.CHAT_HISTORY_CACHE_THREADS, settings.CHAT_HISTORY_CACHE_MESSAGES)
+
+
+class ChatMessageWriter:
+    """
+    Write-behind buffer for chat messages. Turns from all threads are
+    queued and inserted together every ``interval`` seconds, or as soon as
+    ``max_batch`` rows are waiting. A batch that fails ``max_retries`` times
+    in a row is written row by row, and rows that still fail are logged and
+    dropped so they cannot block later writes.
+    """
+
+    def __init__(self, interval: float = 0.05, max_batch: int = 500, max_retries: int = 3):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self._failures = 0
+        self._pending: List[Dict] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def submit(self, rows: List[Dict]):
+        self._pending.extend(rows)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _insert(self, rows: List[Dict]):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ChatMessage), rows)
+            await db.commit()
 
-async def get_chat_history(thread_id: str):
+    async def flush(self):
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            await self._insert(rows)
+        except Exception:
+            self._failures += 1
+            if self._failures < self.max_retries:
+                # Keep the rows for the next attempt rather than losing turns
+                self._pending[:0] = rows
+                raise
+        else:
+            self._failures = 0
+            return
+        self._failures = 0
+        for row in rows:
+            try:
+                await self._insert([row])
+            except Exception as e:
+                logger.error("Dropping chat message %s of thread %s after %d failed writes: %s",
+                             row["id"], row["thread_id"], self.max_retries, e)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Chat message flush failed: %s", e)
+
+
+chat_writer = ChatMessageWriter(
+    settings.CHAT_WRITE_BEHIND_INTERVAL, settings.CHAT_WRITE_BEHIND_BATCH, settings.CHAT_WRITE_BEHIND_RETRIES,
+)
+
+
+async def _load_history(db, thread_id: str) -> List[Dict[str, str]]:
+    result = await db.execute(
+        select(ChatMessage.role, ChatMessage.content)
+        .filter(ChatMessage.thread_id == thread_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(history_cache.max_messages)
+    )
+    return [{"role": role, "content": content} for role, content in reversed(result.all())]
+
+
+class ChatTurn:
+    """
+    Unit of work for one chat turn. Messages added to the turn go to the
+    history cache right away. The user message is persisted as soon as it
+    is added, so it survives a failed or interrupted LLM stream and shows in
+    the history while the reply streams. Later messages are persisted when
+    the turn exits, even if it fails part way. Either write is one commit on
+    the turn's session, or goes through ``chat_writer`` when
+    CHAT_PERSIST_MODE is "write_behind".
+
+        async with ChatTurn(thread_id) as turn:
+            await turn.add_user(text)
+            history = await turn.history()
+            ...
+            turn.add_assistant(reply)
+    """
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.write_behind = settings.CHAT_PERSIST_MODE == "write_behind"
+        self._rows: List[Dict] = []
+        self._db = None
+
+    async def __aenter__(self) -> "ChatTurn":
+        self._db = AsyncSessionLocal()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.persist()
+        finally:
+            await self._db.close()
+        return False
+
+    async def persist(self):
+        """Write (or submit to ``chat_writer``) the messages staged so far."""
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        if self.write_behind:
+            chat_writer.submit(rows)
+            return
+        try:
+            await self._db.execute(insert(ChatMessage), rows)
+            await self._db.commit()
+        except Exception:
+            # The cache already has these messages
+            history_cache.discard(self.thread_id)
+            raise
+
+    def add(self, role: str, content: str):
+        self._rows.append({
+            "id": str(uuid.uuid4()),
+            "thread_id": self.thread_id,
+            "role": role,
+            "content": content,
+            # Taken at staging time so batched rows keep their turn order
+            "created_at": datetime.utcnow(),
+        })
+        history_cache.append(self.thread_id, {"role": role, "content": content})
+
+    async def add_user(self, content: str):
+        self.add("user", content)
+        await self.persist()
+
+    def add_assistant(self, content: str):
+        self.add("assistant", content)
+
+    async def history(self) -> List[Dict[str, str]]:
+        """Recent messages of the thread, including the ones staged so far."""
+        cached = history_cache.get(self.thread_id)
+        if cached is not None:
+            return cached
+        if self.write_behind:
+            await chat_writer.flush()
+        messages = await _load_history(self._db, self.thread_id)
+        # Release the connection; the session is not needed again until the
+        # turn exits, which may be after a long LLM stream
+        await self._db.rollback()
+        messages.extend({"role": r["role"], "content": r["content"]} for r in self._rows)
+        history_cache.put(self.thread_id, messages)
+        return list(messages)
+
+
+async def get_history_page(
+    thread_id: str, limit: int = 50, before: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a thread's messages, oldest first, ending just before the
+    ``before`` cursor (or at the newest message). Returns the messages and
+    the cursor of the next older page, if any.
+    """
+    stmt = select(ChatMessage).filter(ChatMessage.thread_id == thread_id)
+    if before:
+        created_at, message_id = decode_cursor(before)
+        created_at = datetime.fromisoformat(created_at)
+        stmt = stmt.where(or_(
+            ChatMessage.created_at < created_at,
+            and_(ChatMessage.created_at == created_at, ChatMessage.id < message_id),
+        ))
+    stmt = stmt.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit + 1)
     async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(ChatMessage)
-            .filter(ChatMessage.thread_id == thread_id)
-            .order_by(ChatMessage.created_at)
-        )
-        rows = result.scalars().all()
-        return [
-            {"role": r.role, "content": r.content}
-            for r in rows
-        ]
+        rows = (await db.execute(stmt)).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [
+        {
+            "id": r.id,
+            "role": r.role,
+            "content": r.content,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        }
+        for r in reversed(rows)
+    ], next_cursor
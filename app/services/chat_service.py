@@ -1,35 +1,35 @@
+from app.config import settings
 from app.utils.stream_manager import stream_manager
-from app.services.chat_memory import (
-    get_chat_history,
-    save_user_message,
-    save_assistant_message,
-)
+from app.services.chat_context import build_context_window
+from app.services.chat_memory import ChatTurn
 from app.llm.provider import llm  
 
 async def process_chat_message(thread_id: str, user_message: str):
-    # 1. Save user message
-    await save_user_message(thread_id, user_message)
+    async with ChatTurn(thread_id) as turn:
+        # 1. Save the user message before anything can fail
+        await turn.add_user(user_message)
 
-    # 2. Load full chat history
-    history = await get_chat_history(thread_id)
+        # 2. Build the prompt from the cached recent history
+        history = await turn.history()
+        prompt = build_context_window(history, settings.CHAT_CONTEXT_TOKENS, settings.CHAT_SUMMARY_TOKENS)
 
-    full_response = ""
+        parts = []
 
-    # 3. Stream tokens from LLM
-    async for token in llm.stream(history):
-        full_response += token
+        # 3. Stream tokens from LLM
+        async for token in llm.stream(prompt):
+            parts.append(token)
 
-        # 4. STREAM EACH TOKEN
-        await stream_manager.broadcast(
-            thread_id,
-            {
-                "event": "token",
-                "content": token
-            }
-        )
+            # 4. STREAM EACH TOKEN
+            await stream_manager.broadcast(
+                thread_id,
+                {
+                    "event": "token",
+                    "content": token
+                }
+            )
 
-    # 5. Save assistant response to memory
-    await save_assistant_message(thread_id, full_response)
+        # 5. Stage assistant response; it is written on exit
+        turn.add_assistant("".join(parts))
 
     # 6. Signal completion
     await stream_manager.broadcast(
@@ -0,0 +1,156 @@
+"""
+Storage backends for run checkpoints and states.
+
+Records are append-only and addressed by ``(kind, run_id, step)``; writing the
+same step again supersedes the earlier record. Both backends answer
+latest-for-run and by-step lookups from an index instead of scanning storage.
+"""
+import asyncio
+import datetime
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from app.config import settings
+from app.database import async_session
+from app.models.checkpoint import Checkpoint
+
+
+class CheckpointStore(ABC):
+    @abstractmethod
+    async def put(self, kind: str, run_id: str, step: str, data: dict, ts: Optional[datetime.datetime] = None) -> str:
+        ...
+
+    @abstractmethod
+    async def latest(self, kind: str, run_id: str) -> Optional[dict]:
+        """Most recently written record for the run, as ``{"step", "ts", "data"}``."""
+        ...
+
+    @abstractmethod
+    async def get(self, kind: str, run_id: str, step: str) -> Optional[dict]:
+        ...
+
+
+class SQLCheckpointStore(CheckpointStore):
+    """Rows in the ``checkpoints`` table of the application database."""
+
+    async def put(self, kind, run_id, step, data, ts=None):
+        async with async_session() as db:
+            row = Checkpoint(kind=kind, run_id=run_id, step=step, data=data, ts=ts or datetime.datetime.utcnow())
+            db.add(row)
+            await db.commit()
+            return str(row.id)
+
+    async def _first(self, stmt) -> Optional[dict]:
+        async with async_session() as db:
+            row = (await db.execute(stmt.order_by(Checkpoint.id.desc()).limit(1))).scalar_one_or_none()
+        if row is None:
+            return None
+        return {"step": row.step, "ts": row.ts.isoformat(), "data": row.data}
+
+    async def latest(self, kind, run_id):
+        return await self._first(
+            select(Checkpoint).where(Checkpoint.kind == kind, Checkpoint.run_id == run_id)
+        )
+
+    async def get(self, kind, run_id, step):
+        return await self._first(
+            select(Checkpoint).where(Checkpoint.kind == kind, Checkpoint.run_id == run_id, Checkpoint.step == step)
+        )
+
+
+class LogCheckpointStore(CheckpointStore):
+    """
+    Append-only JSON-lines log with an in-memory index of byte offsets. The
+    index is built with one sequential scan the first time the log is used,
+    and lookups first index whatever was appended since, so records written
+    by other processes (e.g. ``app.worker``) are seen too.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Dict[Tuple[str, str], dict] = {}
+        # Bytes of the log indexed so far
+        self._scanned = 0
+        self._lock = asyncio.Lock()
+
+    def _scan(self):
+        with open(self.path, "rb") as f:
+            f.seek(self._scanned)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; picked up by a later scan
+                    break
+                rec = json.loads(line)
+                self._add(self._index, rec["kind"], rec["run_id"], rec["step"], self._scanned)
+                self._scanned += len(line)
+
+    @staticmethod
+    def _add(index, kind, run_id, step, offset):
+        entry = index.setdefault((kind, run_id), {"latest": offset, "steps": {}})
+        entry["latest"] = offset
+        entry["steps"][step] = offset
+
+    def _append(self, line: bytes) -> int:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            # Other processes may have appended since open(); after the
+            # write the position is just past our own line
+            return f.tell() - len(line)
+
+    def _read(self, offset: int) -> dict:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            rec = json.loads(f.readline())
+        return {"step": rec["step"], "ts": rec["ts"], "data": rec["data"]}
+
+    async def _refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size > self._scanned:
+            async with self._lock:
+                if size > self._scanned:
+                    await asyncio.to_thread(self._scan)
+
+    async def put(self, kind, run_id, step, data, ts=None):
+        ts = (ts or datetime.datetime.utcnow()).isoformat()
+        line = (json.dumps({"kind": kind, "run_id": run_id, "step": step, "ts": ts, "data": data}) + "\n").encode()
+        offset = await asyncio.to_thread(self._append, line)
+        async with self._lock:
+            appended_next = offset == self._scanned
+            if appended_next:
+                # Nothing else was appended in between; skip re-reading our own line
+                self._add(self._index, kind, run_id, step, offset)
+                self._scanned += len(line)
+        if not appended_next:
+            await self._refresh()
+        return str(offset)
+
+    async def latest(self, kind, run_id):
+        await self._refresh()
+        entry = self._index.get((kind, run_id))
+        return await asyncio.to_thread(self._read, entry["latest"]) if entry else None
+
+    async def get(self, kind, run_id, step):
+        await self._refresh()
+        entry = self._index.get((kind, run_id))
+        if not entry or step not in entry["steps"]:
+            return None
+        return await asyncio.to_thread(self._read, entry["steps"][step])
+
+
+def create_checkpoint_store(backend: str = None) -> CheckpointStore:
+    backend = backend or settings.CHECKPOINT_BACKEND
+    if backend == "sql":
+        return SQLCheckpointStore()
+    if backend == "log":
+        return LogCheckpointStore(settings.CHECKPOINT_LOG_PATH)
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
+
+
+checkpoint_store = create_checkpoint_store()
@@ -1,23 +1,18 @@
-import os, json, datetime
-BASE = os.path.join("data", "checkpoints")
-os.makedirs(BASE, exist_ok=True)
+from app.services.checkpoint_backends import CheckpointStore, checkpoint_store
 
 class CheckpointService:
-    def save(self, run_id: str, step: str, state: dict) -> str:
-        filename = f"{run_id}__{step}.json"
-        path = os.path.join(BASE, filename)
-        with open(path, "w") as f:
-            json.dump({"step": step, "ts": datetime.datetime.utcnow().isoformat(), "state": state}, f)
-        return path
+    def __init__(self, store: CheckpointStore):
+        self.store = store
 
-    def load(self, run_id: str, step: str = None):
+    async def save(self, run_id: str, step: str, state: dict) -> str:
+        return await self.store.put("checkpoint", run_id, step, state)
+
+    async def load(self, run_id: str, step: str = None):
         if step:
-            path = os.path.join(BASE, f"{run_id}__{step}.json")
-            if not os.path.exists(path): return None
-            with open(path) as f: return json.load(f)
-        files = [f for f in os.listdir(BASE) if f.startswith(run_id)]
-        if not files: return None
-        files.sort();  path = os.path.join(BASE, files[-1])
-        with open(path) as f: return json.load(f)
+            rec = await self.store.get("checkpoint", run_id, step)
+        else:
+            rec = await self.store.latest("checkpoint", run_id)
+        if rec is None: return None
+        return {"step": rec["step"], "ts": rec["ts"], "state": rec["data"]}
 
-checkpoint_service = CheckpointService()
+checkpoint_service = CheckpointService(checkpoint_store)
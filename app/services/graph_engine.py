@@ -0,0 +1,260 @@
+"""
+Minimal LangGraph-style graph engine.
+
+A graph is a set of named nodes connected by static edges, conditional edges
+and join edges. Execution proceeds in supersteps: every node activated by the
+previous step runs concurrently, their state updates are merged, and the edges
+leaving them decide which nodes run next.
+
+Nodes take the current state dict and return a dict of updates. They may be
+coroutine functions or plain functions; plain functions can be pushed to a
+thread pool (``executor="thread"``) or a process pool (``executor="process"``,
+the function and state must be picklable) so CPU-bound work never blocks the
+event loop.
+"""
+import asyncio
+import inspect
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+from app.utils.metrics import metrics
+
+node_seconds = metrics.histogram(
+    "workflow_node_seconds", "Graph node execution time", ("workflow", "node", "status"),
+)
+
+START = "__start__"
+END = "__end__"
+
+NodeFn = Callable[[Dict[str, Any]], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]
+Router = Callable[[Dict[str, Any]], Union[str, List[str]]]
+# Called as each node finishes with (node_name, update, state at the start of the step)
+NodeCallback = Callable[[str, Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+CheckpointCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+# Called with (node_name, "running") as a node starts and (node_name, "failed") if it raises
+NodeStatusCallback = Callable[[str, str], Awaitable[None]]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+    return _process_pool
+
+
+class GraphError(Exception):
+    pass
+
+
+class Node:
+    def __init__(self, name: str, fn: NodeFn, executor: Optional[str] = None):
+        if executor not in (None, "thread", "process"):
+            raise GraphError(f"Unknown executor {executor!r} for node {name!r}")
+        if executor and inspect.iscoroutinefunction(fn):
+            raise GraphError(f"Node {name!r} is async and cannot run on a {executor} pool")
+        self.name = name
+        self.fn = fn
+        self.executor = executor
+
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if self.executor == "thread":
+            update = await asyncio.to_thread(self.fn, dict(state))
+        elif self.executor == "process":
+            loop = asyncio.get_running_loop()
+            update = await loop.run_in_executor(_get_process_pool(), self.fn, dict(state))
+        else:
+            update = self.fn(state)
+            if inspect.isawaitable(update):
+                update = await update
+        return update or {}
+
+
+class Graph:
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        reducers: Optional[Dict[str, Callable[[Any, Any], Any]]] = None,
+        max_steps: int = 50,
+    ):
+        self.name = name
+        self.description = description
+        # State keys whose updates are combined instead of overwritten,
+        # e.g. {"results": operator.add} for fan-in of list outputs
+        self.reducers = reducers or {}
+        self.max_steps = max_steps
+        self.nodes: Dict[str, Node] = {}
+        self.edges: Dict[str, List[str]] = {}
+        self.conditional: Dict[str, tuple] = {}
+        self.joins: List[tuple] = []
+
+    # ---- building ----
+
+    def add_node(self, name: str, fn: NodeFn, executor: Optional[str] = None) -> "Graph":
+        if name in (START, END) or name in self.nodes:
+            raise GraphError(f"Invalid or duplicate node name {name!r}")
+        self.nodes[name] = Node(name, fn, executor)
+        return self
+
+    def add_edge(self, src: Union[str, Iterable[str]], dst: str) -> "Graph":
+        """
+        ``add_edge("a", "b")`` runs b after a. ``add_edge(["a", "b"], "c")``
+        is a join: c runs once both a and b have completed.
+        """
+        if isinstance(src, str):
+            self.edges.setdefault(src, []).append(dst)
+        else:
+            self.joins.append((frozenset(src), dst))
+        return self
+
+    def add_conditional_edges(
+        self, src: str, router: Router, path_map: Optional[Dict[str, str]] = None
+    ) -> "Graph":
+        """After ``src`` runs, ``router(state)`` names the next node(s)."""
+        self.conditional[src] = (router, path_map)
+        return self
+
+    def validate(self) -> "Graph":
+        known = set(self.nodes) | {START, END}
+        if START not in self.edges and START not in self.conditional:
+            raise GraphError(f"Graph {self.name!r} has no edge from START")
+        refs = [(s, d) for s, ds in self.edges.items() for d in ds]
+        refs += [(s, d) for srcs, d in self.joins for s in srcs]
+        refs += [(s, d) for s, (_, pm) in self.conditional.items() for d in (pm or {}).values()]
+        refs += [(s, s) for s in self.conditional]
+        for s, d in refs:
+            if s not in known or d not in known:
+                raise GraphError(f"Graph {self.name!r} references unknown node in edge {s!r} -> {d!r}")
+        return self
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "nodes": [{"name": n.name, "executor": n.executor} for n in self.nodes.values()],
+            "edges": [{"source": s, "target": d} for s, ds in self.edges.items() for d in ds],
+            "joins": [{"sources": sorted(srcs), "target": d} for srcs, d in self.joins],
+            "conditional": sorted(self.conditional),
+        }
+
+    # ---- execution ----
+
+    def _successors(self, node: str, state: Dict[str, Any]) -> Set[str]:
+        nxt = set(self.edges.get(node, []))
+        if node in self.conditional:
+            router, path_map = self.conditional[node]
+            picked = router(state)
+            for p in [picked] if isinstance(picked, str) else picked:
+                target = path_map.get(p) if path_map else p
+                if target is None or (target not in self.nodes and target != END):
+                    raise GraphError(f"Router of node {node!r} in graph {self.name!r} returned unknown route {p!r}")
+                nxt.add(target)
+        return nxt
+
+    def _merge(self, state: Dict[str, Any], update: Dict[str, Any]):
+        for k, v in update.items():
+            if k in self.reducers and k in state:
+                state[k] = self.reducers[k](state[k], v)
+            else:
+                state[k] = v
+
+    async def run(
+        self,
+        state: Dict[str, Any],
+        on_node_complete: Optional[NodeCallback] = None,
+        on_checkpoint: Optional[CheckpointCallback] = None,
+        resume: Optional[Dict[str, Any]] = None,
+        on_node_status: Optional[NodeStatusCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the graph to completion and return the final state.
+
+        ``on_checkpoint`` receives a JSON-serializable snapshot before the
+        first step, after every completed step, and when a step fails (with
+        the updates of the nodes that did finish under ``partial``). Passing
+        such a snapshot back as ``resume`` continues from it without
+        re-running completed nodes. ``on_node_status`` hears each node start
+        and fail.
+        """
+        if resume:
+            state = resume["state"]
+            step = resume["step"]
+            active = set(resume["next"])
+            done_for_join = set(resume["joined"])
+            partial = dict(resume.get("partial") or {})
+        else:
+            step = 0
+            active = self._successors(START, state)
+            done_for_join: Set[str] = set()
+            partial: Dict[str, Dict[str, Any]] = {}
+
+        def checkpoint() -> Dict[str, Any]:
+            return {
+                "step": step,
+                "state": state,
+                "next": sorted(active),
+                "joined": sorted(done_for_join),
+                "partial": dict(partial),
+            }
+
+        async def run_node(name: str) -> Dict[str, Any]:
+            if on_node_status:
+                await on_node_status(name, "running")
+            started = time.perf_counter()
+            try:
+                update = await self.nodes[name](state)
+            except BaseException as e:
+                node_seconds.labels(self.name, name, "failed").observe(time.perf_counter() - started)
+                # Not on cancellation: the node did not fail, the run was stopped
+                if on_node_status and isinstance(e, Exception):
+                    await on_node_status(name, "failed")
+                raise
+            node_seconds.labels(self.name, name, "completed").observe(time.perf_counter() - started)
+            if on_node_complete:
+                await on_node_complete(name, update, state)
+            return update
+
+        if on_checkpoint and not resume:
+            await on_checkpoint(checkpoint())
+
+        while active - {END}:
+            if step >= self.max_steps:
+                raise GraphError(f"Graph {self.name!r} exceeded {self.max_steps} steps")
+            batch = sorted(active - {END})
+            todo = [n for n in batch if n not in partial]
+            results = await asyncio.gather(*(run_node(n) for n in todo), return_exceptions=True)
+            errors = []
+            for name, result in zip(todo, results):
+                if isinstance(result, BaseException):
+                    errors.append(result)
+                else:
+                    partial[name] = result
+            if errors:
+                if on_checkpoint:
+                    await on_checkpoint(checkpoint())
+                raise errors[0]
+
+            # Merge in batch order so reducers see a deterministic sequence
+            for name in batch:
+                self._merge(state, partial[name])
+            nxt: Set[str] = set()
+            for name in batch:
+                nxt |= self._successors(name, state)
+            # A join target that just ran starts over, so in a cycle the next
+            # pass does not fire it on completions from an earlier one
+            for srcs, dst in self.joins:
+                if dst in batch:
+                    done_for_join -= srcs
+            done_for_join |= set(batch)
+            for srcs, dst in self.joins:
+                if srcs <= done_for_join:
+                    nxt.add(dst)
+                    done_for_join -= srcs
+            step += 1
+            active = nxt
+            partial = {}
+            if on_checkpoint:
+                await on_checkpoint(checkpoint())
+        return state
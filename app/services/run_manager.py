@@ -1,30 +1,84 @@
 import uuid
 import json
-from typing import Optional, Dict
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select       
+from sqlalchemy import select, insert, update, and_, or_
 from app.models.run import Run
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# Listable fields and the columns they need; meta/result are the heavy JSON ones
+RUN_FIELDS = {
+    "id": Run.id,
+    "name": Run.name,
+    "status": Run.status,
+    "created_at": Run.created_at,
+    "updated_at": Run.updated_at,
+    "current_node": Run.current_node,
+    "node_status": Run.node_status,
+    "nodes_completed": Run.nodes_completed,
+    "meta": Run.run_meta,
+    "result": Run.result,
+}
+
+def _decode_json(value):
+    return json.loads(value) if isinstance(value, str) else value
 
 
 class RunManager:
+    """
+    Run rows are written with single INSERT/UPDATE statements rather than
+    loaded into the session first, so each status change is one round trip.
+    """
+
     async def create(self, db: AsyncSession, name: str, meta: Optional[Dict] = None) -> str:
-        run_id = str(uuid.uuid4())
-        db_run = Run(id=run_id, name=name, status="running", run_meta=json.dumps(meta or {}))
-        db.add(db_run)
-        await db.commit()
-        await db.refresh(db_run)
-        return run_id
+        return (await self.create_many(db, [(name, meta)]))[0]
 
-    async def update(self, db: AsyncSession, run_id: str, status: Optional[str] = None, result: Optional[Dict] = None):
-        stmt = select(Run).where(Run.id == run_id)   
-        result_obj = await db.execute(stmt)
-        row = result_obj.scalar_one_or_none()
-        if not row:
-            raise KeyError("Run not found")
+    async def create_many(self, db: AsyncSession, runs: Sequence[Tuple[str, Optional[Dict]]]) -> List[str]:
+        """Insert ``(name, meta)`` pairs in one statement and commit; returns the new ids."""
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "name": name,
+                "status": "running",
+                "created_at": datetime.now(timezone.utc),
+                "run_meta": json.dumps(meta or {}),
+            }
+            for name, meta in runs
+        ]
+        if rows:
+            await db.execute(insert(Run), rows)
+            await db.commit()
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    def _values(status: Optional[str], result: Optional[Dict]) -> Dict:
+        values = {}
         if status:
-            row.status = status
+            values["status"] = status
         if result is not None:
-            row.result = json.dumps(result)
+            values["result"] = json.dumps(result)
+        return values
+
+    async def update(self, db: AsyncSession, run_id: str, status: Optional[str] = None, result: Optional[Dict] = None):
+        stmt = update(Run).where(Run.id == run_id).values(**self._values(status, result))
+        if db.bind.dialect.update_returning:
+            found = (await db.execute(stmt.returning(Run.id))).scalar_one_or_none() is not None
+        else:
+            found = (await db.execute(stmt)).rowcount > 0
+        await db.commit()
+        if not found:
+            raise KeyError("Run not found")
+
+    async def record_node(self, db: AsyncSession, run_id: str, node: str, status: str = "completed"):
+        """
+        Track the latest node of a run and its status (running, completed or
+        failed), and count completed ones, without reading the row.
+        """
+        values = {"current_node": node, "node_status": status}
+        if status == "completed":
+            values["nodes_completed"] = Run.nodes_completed + 1
+        await db.execute(update(Run).where(Run.id == run_id).values(**values))
         await db.commit()
 
     async def get(self, db: AsyncSession, run_id: str) -> Optional[Run]:
@@ -32,5 +86,68 @@ class RunManager:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def list(
+        self,
+        db: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        name: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of runs, newest first, and the cursor of the next page.
+        Only the columns behind ``fields`` are selected (all by default);
+        raises ValueError for unknown fields or a malformed cursor.
+        """
+        fields = list(fields or RUN_FIELDS)
+        unknown = [f for f in fields if f not in RUN_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # The sort key is always selected so the next cursor can be built
+        columns = {f: RUN_FIELDS[f] for f in fields}
+        columns.setdefault("id", Run.id)
+        columns.setdefault("created_at", Run.created_at)
+
+        stmt = select(*[c.label(f) for f, c in columns.items()])
+        if status:
+            stmt = stmt.where(Run.status == status)
+        if name:
+            stmt = stmt.where(Run.name == name)
+        if created_after:
+            stmt = stmt.where(Run.created_at >= created_after)
+        if created_before:
+            stmt = stmt.where(Run.created_at < created_before)
+        if cursor:
+            created_at, run_id = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+            stmt = stmt.where(or_(
+                Run.created_at < created_at,
+                and_(Run.created_at == created_at, Run.id < run_id),
+            ))
+        stmt = stmt.order_by(Run.created_at.desc(), Run.id.desc()).limit(limit + 1)
+        rows = (await db.execute(stmt)).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        runs = []
+        for row in rows:
+            item = {}
+            for f in fields:
+                value = row[f]
+                if f in ("created_at", "updated_at"):
+                    value = value.isoformat() if value else None
+                elif f == "meta":
+                    value = _decode_json(value) or {}
+                elif f == "result":
+                    value = _decode_json(value)
+                item[f] = value
+            runs.append(item)
+        return runs, next_cursor
+
 
 run_manager = RunManager()
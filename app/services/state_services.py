@@ -1,21 +1,16 @@
-# Minimal file-based state store. Replace with Redis for production.
-import os, json, datetime
-BASE = os.path.join("data", "states")
-os.makedirs(BASE, exist_ok=True)
+import datetime
+from app.services.checkpoint_backends import CheckpointStore, checkpoint_store
 
 class StateService:
-    def save(self, run_id: str, state: dict) -> str:
-        fname = f"{run_id}__{int(datetime.datetime.utcnow().timestamp())}.json"
-        path = os.path.join(BASE, fname)
-        with open(path, "w") as f:
-            json.dump({"ts": datetime.datetime.utcnow().isoformat(), "state": state}, f)
-        return path
+    def __init__(self, store: CheckpointStore):
+        self.store = store
 
-    def load_latest(self, run_id: str):
-        files = [f for f in os.listdir(BASE) if f.startswith(run_id)]
-        if not files: return None
-        files.sort()
-        with open(os.path.join(BASE, files[-1])) as f:
-            return json.load(f)["state"]
+    async def save(self, run_id: str, state: dict) -> str:
+        step = str(int(datetime.datetime.utcnow().timestamp()))
+        return await self.store.put("state", run_id, step, state)
 
-state_service = StateService()
+    async def load_latest(self, run_id: str):
+        rec = await self.store.latest("state", run_id)
+        return rec["data"] if rec else None
+
+state_service = StateService(checkpoint_store)
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import operator
+from typing import Dict, List, Optional
+from app.services.graph_engine import Graph, START, END
+
+
+class WorkflowRegistry:
+    def __init__(self):
+        self._graphs: Dict[str, Graph] = {}
+
+    def register(self, graph: Graph) -> Graph:
+        self._graphs[graph.name] = graph.validate()
+        return graph
+
+    def get(self, name: str) -> Optional[Graph]:
+        return self._graphs.get(name)
+
+    def list(self) -> List[Dict]:
+        return [g.describe() for g in self._graphs.values()]
+
+
+workflow_registry = WorkflowRegistry()
+
+
+# ---- default: planner -> executor -> validator ----
+
+async def _planner(state: dict) -> dict:
+    await asyncio.sleep(1)
+    return {"output": f"Planning workflow for: {state['task']}"}
+
+async def _executor(state: dict) -> dict:
+    await asyncio.sleep(1.5)
+    return {"output": f"Executing task: {state['task']}"}
+
+async def _validator(state: dict) -> dict:
+    await asyncio.sleep(1.2)
+    return {"output": "Workflow execution validated successfully", "validated": True}
+
+workflow_registry.register(
+    Graph("default", "Sequential planner, executor and validator")
+    .add_node("planner", _planner)
+    .add_node("executor", _executor)
+    .add_node("validator", _validator)
+    .add_edge(START, "planner")
+    .add_edge("planner", "executor")
+    .add_edge("executor", "validator")
+    .add_edge("validator", END)
+)
+
+
+# ---- parallel_tools: planner fans out to independent tools, joins, validates ----
+
+async def _search(state: dict) -> dict:
+    await asyncio.sleep(1)
+    return {"output": f"Search results for: {state['task']}", "tool_results": ["search"]}
+
+async def _lookup(state: dict) -> dict:
+    await asyncio.sleep(1)
+    return {"output": f"Knowledge lookup for: {state['task']}", "tool_results": ["lookup"]}
+
+def _fingerprint(state: dict) -> dict:
+    # CPU-bound example; runs on the thread pool
+    digest = state["task"].encode()
+    for _ in range(10000):
+        digest = hashlib.sha256(digest).digest()
+    return {"output": f"Fingerprint {digest.hex()[:16]}", "tool_results": ["fingerprint"]}
+
+async def _synthesizer(state: dict) -> dict:
+    tools = ", ".join(sorted(state.get("tool_results", [])))
+    return {"output": f"Synthesized answer from: {tools}", "attempts": state.get("attempts", 0) + 1}
+
+def _route_validation(state: dict) -> str:
+    return "done" if len(state.get("tool_results", [])) >= 3 or state.get("attempts", 0) >= 2 else "retry"
+
+workflow_registry.register(
+    Graph(
+        "parallel_tools",
+        "Planner fans out to independent tools that run concurrently, then synthesizes",
+        reducers={"tool_results": operator.add},
+    )
+    .add_node("planner", _planner)
+    .add_node("search", _search)
+    .add_node("lookup", _lookup)
+    .add_node("fingerprint", _fingerprint, executor="thread")
+    .add_node("synthesizer", _synthesizer)
+    .add_edge(START, "planner")
+    .add_edge("planner", "search")
+    .add_edge("planner", "lookup")
+    .add_edge("planner", "fingerprint")
+    .add_edge(["search", "lookup", "fingerprint"], "synthesizer")
+    .add_conditional_edges("synthesizer", _route_validation, {"done": END, "retry": "planner"})
+)
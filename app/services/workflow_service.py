@@ -1,58 +1,77 @@
 import asyncio
 import json
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from app.models.run import Run
 from app.services.run_manager import run_manager
 from app.services.state_services import state_service
 from app.services.checkpoint_store import checkpoint_service
 from app.services.artifact_store import artifact_service
+from app.services.workflow_registry import workflow_registry
+from app.utils.logger import logger
 from app.utils.stream_manager import stream_manager
-from app.utils.task_queue import task_queue
+from app.utils.job_queue import Job, job_queue
 from app.database import async_session 
 
+RUN_JOB = "run_workflow"
 
-async def _execute_workflow(run_id: str, payload: dict):
+
+async def _execute_workflow(run_id: str, payload: dict, workflow_id: str = "default", checkpoint: Optional[dict] = None):
+    """
+    Run a workflow graph for ``run_id``. When ``checkpoint`` is given (as
+    written by a previous attempt) execution continues from it and nodes that
+    already completed are not run again. Errors are re-raised so the job
+    queue can retry; the run is only marked failed once it is dead-lettered.
+    """
     async with async_session() as db:   
         try:
+            graph = workflow_registry.get(workflow_id)
+            if graph is None:
+                raise ValueError(f"Unknown workflow: {workflow_id}")
+
             # Extract task from payload
             task_description = payload.get("input", "Workflow execution")
             
             # Workflow execution tracking
-            workflow_steps = []
-            
-            # Start workflow
-            await stream_manager.broadcast(run_id, {"event": "started", "run_id": run_id})
-            
-            # Step 1: Planner Node
-            await asyncio.sleep(1)
-            planner_output = f"Planning workflow for: {task_description}"
-            workflow_steps.append({
-                "node": "planner",
-                "output": planner_output,
-                "timestamp": asyncio.get_event_loop().time()
-            })
-            state_service.save(run_id, {"step": "planning", "payload": payload})
-            await stream_manager.broadcast(run_id, {"event": "node_update", "node": "planner", "output": planner_output})
-            
-            # Step 2: Executor Node
-            await asyncio.sleep(1.5)
-            executor_output = f"Executing task: {task_description}"
-            workflow_steps.append({
-                "node": "executor",
-                "output": executor_output,
-                "timestamp": asyncio.get_event_loop().time()
-            })
-            checkpoint_service.save(run_id, "execution", {"status": "in_progress"})
-            await stream_manager.broadcast(run_id, {"event": "node_update", "node": "executor", "output": executor_output})
+            workflow_steps = list(checkpoint["steps"]) if checkpoint else []
             
-            # Step 3: Validator Node
-            await asyncio.sleep(1.2)
-            validator_output = "Workflow execution validated successfully"
-            workflow_steps.append({
-                "node": "validator",
-                "output": validator_output,
-                "timestamp": asyncio.get_event_loop().time()
-            })
-            checkpoint_service.save(run_id, "validation", {"validated": True})
-            await stream_manager.broadcast(run_id, {"event": "node_update", "node": "validator", "output": validator_output})
+            if checkpoint:
+                await stream_manager.broadcast(run_id, {"event": "resumed", "run_id": run_id, "step": checkpoint["step"]})
+            else:
+                await stream_manager.broadcast(run_id, {"event": "started", "run_id": run_id, "workflow": workflow_id})
+
+            async def on_node_complete(node: str, update: dict, state: dict):
+                output = update.get("output")
+                workflow_steps.append({
+                    "node": node,
+                    "output": output,
+                    "timestamp": asyncio.get_event_loop().time()
+                })
+                # Own session: parallel branches complete concurrently
+                async with async_session() as node_db:
+                    await run_manager.record_node(node_db, run_id, node)
+                await stream_manager.broadcast(run_id, {"event": "node_update", "node": node, "output": output})
+
+            async def on_node_status(node: str, status: str):
+                async with async_session() as node_db:
+                    await run_manager.record_node(node_db, run_id, node, status)
+
+            async def on_checkpoint(cp: dict):
+                await checkpoint_service.save(run_id, f"step-{cp['step']:04d}", {
+                    **cp,
+                    "workflow": workflow_id,
+                    "payload": payload,
+                    "steps": workflow_steps,
+                })
+
+            state = await graph.run(
+                {"task": task_description, "payload": payload},
+                on_node_complete,
+                on_checkpoint,
+                resume=checkpoint,
+                on_node_status=on_node_status,
+            )
+            await state_service.save(run_id, state)
             
             # Generate final output
             final_output = f"Successfully completed workflow for: {task_description}. All nodes executed and validated."
@@ -61,6 +80,7 @@ async def _execute_workflow(run_id: str, payload: dict):
             # Create structured artifact
             artifact_data = {
                 "task": task_description,
+                "workflow": workflow_id,
                 "steps": workflow_steps,
                 "final_output": final_output,
                 "confidence_score": confidence_score,
@@ -71,7 +91,7 @@ async def _execute_workflow(run_id: str, payload: dict):
             
             # Save artifact
             artifact_json = json.dumps(artifact_data, indent=2)
-            aid = artifact_service.save_bytes(run_id, "workflow_result.json", artifact_json.encode('utf-8'))
+            aid = await artifact_service.save_bytes_async(run_id, "workflow_result.json", artifact_json.encode('utf-8'))
 
             # Update run status
             await run_manager.update(db, run_id, status="completed", result={
@@ -88,7 +108,98 @@ async def _execute_workflow(run_id: str, payload: dict):
         except asyncio.CancelledError:
             await run_manager.update(db, run_id, status="cancelled")
             await stream_manager.broadcast(run_id, {"event": "cancelled", "run_id": run_id})
+            # Let the job worker see it: a cancelled job is handed back, not acked
+            raise
 
         except Exception as e:
-            await run_manager.update(db, run_id, status="failed", result={"error": str(e)})
-            await stream_manager.broadcast(run_id, {"event": "failed", "error": str(e)})
\ No newline at end of file
+            await stream_manager.broadcast(run_id, {"event": "error", "error": str(e)})
+            raise
+
+
+async def load_resume_checkpoint(run_id: str) -> Optional[dict]:
+    """Latest graph checkpoint for a run, or None if it never started."""
+    cp = await checkpoint_service.load(run_id)
+    if not cp or "workflow" not in cp.get("state", {}):
+        return None
+    return cp["state"]
+
+
+def _job_key(run_id: str) -> str:
+    return f"run:{run_id}"
+
+
+async def enqueue_run(run_id: str, payload: dict, workflow_id: str = "default",
+                      lane: str = "batch", tenant: Optional[str] = None) -> bool:
+    """
+    Queue a run for a worker on ``lane``, shared fairly with other tenants;
+    False if a job for it is already queued or running.
+    """
+    job = {"run_id": run_id, "payload": payload, "workflow_id": workflow_id}
+    return await job_queue.enqueue(RUN_JOB, job, key=_job_key(run_id), lane=lane, tenant=tenant) is not None
+
+
+async def run_job_active(run_id: str) -> bool:
+    """Whether a job for the run is queued or being executed."""
+    return await job_queue.is_active(_job_key(run_id))
+
+
+async def enqueue_runs(runs: List[Tuple[str, dict, str]], tenant: Optional[str] = None):
+    """Queue many new ``(run_id, payload, workflow_id)`` runs in one go on the batch lane."""
+    await job_queue.enqueue_many(
+        RUN_JOB,
+        [{"run_id": run_id, "payload": payload, "workflow_id": workflow_id} for run_id, payload, workflow_id in runs],
+        keys=[_job_key(run_id) for run_id, _, _ in runs],
+        lane="batch", tenant=tenant,
+    )
+
+
+async def run_workflow_job(job: dict):
+    """
+    Job handler for RUN_JOB. A job can be delivered more than once, so a
+    run that already finished is skipped and one that got partway continues
+    from its latest checkpoint.
+    """
+    run_id = job["run_id"]
+    async with async_session() as db:
+        run = await run_manager.get(db, run_id)
+        # A failed run only gets a job again through resume or requeue_dead
+        if run is None or run.status == "completed":
+            return
+        checkpoint = await load_resume_checkpoint(run_id)
+        if run.status != "running":
+            await run_manager.update(db, run_id, status="running")
+    if checkpoint is not None:
+        await _execute_workflow(run_id, checkpoint["payload"], checkpoint["workflow"], checkpoint=checkpoint)
+    else:
+        await _execute_workflow(run_id, job["payload"], job["workflow_id"])
+
+
+async def fail_run_job(job: Job, error: str):
+    """Dead-letter handler for RUN_JOB: the run is out of attempts."""
+    run_id = job.payload["run_id"]
+    async with async_session() as db:
+        await run_manager.update(db, run_id, status="failed", result={"error": error})
+    await stream_manager.broadcast(run_id, {"event": "failed", "error": error})
+
+
+job_queue.on_dead(RUN_JOB, fail_run_job)
+
+
+async def recover_runs():
+    """
+    Re-queue runs left in status "running" with no job behind them, e.g. by
+    a process that predates the job queue. Runs with no checkpoint never
+    started executing and are marked failed.
+    """
+    async with async_session() as db:
+        result = await db.execute(select(Run.id).where(Run.status == "running"))
+        run_ids = result.scalars().all()
+        for run_id in run_ids:
+            if await run_job_active(run_id):
+                continue
+            checkpoint = await load_resume_checkpoint(run_id)
+            if checkpoint is None:
+                await run_manager.update(db, run_id, status="failed", result={"error": "Interrupted before start"})
+                continue
+            logger.info("Recovering run %s from step %s", run_id, checkpoint["step"])
+            await enqueue_run(run_id, checkpoint["payload"], checkpoint["workflow"])
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import uuid
+from typing import AsyncIterable, Optional, Tuple
+import aiofiles
+import aiofiles.os
+
+
+class FileTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"File exceeds {limit} bytes")
+        self.limit = limit
+
+
+async def _discard(tmp: str):
+    if await aiofiles.os.path.exists(tmp):
+        await aiofiles.os.remove(tmp)
+
+
+async def atomic_write(path: str, data: bytes):
+    """
+    Write ``data`` to ``path`` without blocking the event loop. The bytes go
+    to a temp file in the same directory which is fsynced and then renamed
+    over ``path``, so readers never observe a partially written file.
+    """
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(data)
+            await f.flush()
+            await aiofiles.os.wrap(os.fsync)(f.fileno())
+        await aiofiles.os.replace(tmp, path)
+    except BaseException:
+        await _discard(tmp)
+        raise
+
+
+async def atomic_write_stream(
+    path: str, chunks: AsyncIterable[bytes], max_size: Optional[int] = None
+) -> Tuple[int, str]:
+    """
+    Stream ``chunks`` to ``path`` the same way as atomic_write, holding one
+    chunk in memory at a time. Returns ``(size, sha256 hex digest)``; raises
+    FileTooLarge (and leaves nothing behind) once ``max_size`` is exceeded.
+    """
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLarge(max_size)
+                digest.update(chunk)
+                await f.write(chunk)
+            await f.flush()
+            await aiofiles.os.wrap(os.fsync)(f.fileno())
+        await aiofiles.os.replace(tmp, path)
+    except BaseException:
+        await _discard(tmp)
+        raise
+    return size, digest.hexdigest()
+
+
+async def iter_file(path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 1024 * 1024):
+    """Yield bytes ``start..end`` (inclusive) of ``path`` in chunks."""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,582 @@
+"""
+Durable job queue for work that has to survive restarts and may run in
+separate worker processes (``python -m app.worker``).
+
+Delivery is at-least-once. A claimed job is leased to one worker, which
+renews the lease while the job runs and acks the job when it is done; if
+the worker dies the lease runs out and the job is delivered again. Failed
+jobs are retried with exponential backoff, and a job that has used up
+``max_attempts`` deliveries goes to a dead-letter list instead, from which
+it can be requeued by hand.
+
+Each job is queued on a lane from ``task_queue.LANES``; a lane is only
+served while every lane above it is empty. Within a lane the SQL queue is
+fair across tenants (weighted by ``TASK_QUEUE_TENANT_WEIGHTS``) the same
+way the in-process task queue is; the Redis queue is FIFO within a lane.
+
+``SQLJobQueue`` keeps jobs in the ``jobs`` table; ``RedisJobQueue`` keeps
+them in one Redis stream per lane, read through a consumer group.
+"""
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import async_session
+from app.models.job import Job as JobRow
+from app.utils.logger import logger
+from app.utils.task_queue import LANES
+
+_jobs = JobRow.__table__
+_ACTIVE = ("queued", "leased")
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _priority(lane: str) -> int:
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane {lane!r}")
+    return LANES.index(lane)
+
+
+class Job:
+    __slots__ = ("id", "kind", "payload", "key", "attempts", "max_attempts", "worker", "receipt", "error", "lane")
+
+    def __init__(self, id: str, kind: str, payload: dict, key: Optional[str], attempts: int,
+                 max_attempts: int, worker: str, receipt, error: Optional[str] = None,
+                 lane: str = "batch"):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.key = key
+        # Deliveries so far, including this one
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.worker = worker
+        # Proof of the lease: the lease token (SQL) or stream entry id (Redis)
+        self.receipt = receipt
+        self.error = error
+        self.lane = lane
+
+
+class JobQueue(ABC):
+    def __init__(self, max_attempts: int = 3, retry_base_delay: float = 2.0, retry_max_delay: float = 300.0,
+                 weights: Optional[Dict[str, float]] = None):
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.weights = weights or {}
+        self._dead_handlers: Dict[str, Callable[[Job, str], Awaitable]] = {}
+
+    @abstractmethod
+    async def enqueue(self, kind: str, payload: dict, key: Optional[str] = None,
+                      delay: float = 0.0, max_attempts: Optional[int] = None,
+                      lane: str = "batch", tenant: Optional[str] = None) -> Optional[str]:
+        """
+        Add a job to ``lane`` on behalf of ``tenant`` and return its id. With
+        ``key``, returns None instead if a job with the same key is still
+        queued or leased.
+        """
+
+    async def enqueue_many(self, kind: str, payloads: List[dict],
+                           keys: Optional[List[Optional[str]]] = None,
+                           lane: str = "batch", tenant: Optional[str] = None) -> List[Optional[str]]:
+        keys = keys or [None] * len(payloads)
+        return [
+            await self.enqueue(kind, payload, key, lane=lane, tenant=tenant)
+            for payload, key in zip(payloads, keys)
+        ]
+
+    @abstractmethod
+    async def claim(self, worker: str, limit: int, lease: float, wait: float = 0.0) -> List[Job]:
+        """
+        Lease up to ``limit`` due jobs to ``worker`` for ``lease`` seconds,
+        waiting up to ``wait`` seconds for one if none is due.
+        """
+
+    @abstractmethod
+    async def extend(self, job: Job, lease: float) -> bool:
+        """Renew the lease; False if the worker no longer holds it."""
+
+    @abstractmethod
+    async def complete(self, job: Job):
+        ...
+
+    @abstractmethod
+    async def _requeue(self, job: Job, attempts: int, delay: float, error: Optional[str]):
+        ...
+
+    @abstractmethod
+    async def _bury(self, job: Job, error: str):
+        """Move the job to the dead-letter list."""
+
+    @abstractmethod
+    async def is_active(self, key: str) -> bool:
+        """Whether a job with ``key`` is queued or leased."""
+
+    @abstractmethod
+    async def dead_letters(self, limit: int = 100) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def requeue_dead(self, job_id: str) -> bool:
+        """Give a dead-lettered job a fresh set of attempts."""
+
+    @abstractmethod
+    async def stats(self) -> Dict:
+        ...
+
+    def on_dead(self, kind: str, handler: Callable[[Job, str], Awaitable]):
+        """Call ``handler(job, error)`` whenever a job of ``kind`` is dead-lettered."""
+        self._dead_handlers[kind] = handler
+
+    async def bury(self, job: Job, error: str):
+        await self._bury(job, error)
+        handler = self._dead_handlers.get(job.kind)
+        if handler is not None:
+            try:
+                await handler(job, error)
+            except Exception:
+                logger.exception("Dead-letter handler for job %s (%s) failed", job.id, job.kind)
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """Schedule a retry, or dead-letter the job if it has no attempts left. True if retried."""
+        if job.attempts >= job.max_attempts:
+            await self.bury(job, error)
+            return False
+        await self._requeue(job, job.attempts, self.retry_delay(job.attempts), error)
+        return True
+
+    async def release(self, job: Job):
+        """Hand a job back undone (e.g. on shutdown) without using up an attempt."""
+        await self._requeue(job, job.attempts - 1, 0.0, job.error)
+
+
+class SQLJobQueue(JobQueue):
+    """
+    Jobs as rows in the ``jobs`` table. Claiming is a single UPDATE of the
+    first due rows (``FOR UPDATE SKIP LOCKED`` on Postgres; SQLite
+    serializes writers), so concurrent workers never lease the same job.
+    Finished jobs are deleted; the run itself records the outcome.
+
+    Due rows are taken by lane, then by ``fair_at``: a virtual finish tag of
+    ``max(lane head, tenant's last queued tag) + 1 / weight``, so a tenant
+    with a long backlog does not hold up one that just arrived.
+    """
+
+    def __init__(self, session_factory=async_session, **options):
+        super().__init__(**options)
+        self._session = session_factory
+        # Wakes claimers in this process as soon as a job is added
+        self._wakeup = asyncio.Event()
+
+    async def _fair_tags(self, db, priority: int, tenant: str, count: int) -> List[float]:
+        queued = and_(_jobs.c.status == "queued", _jobs.c.priority == priority)
+        head, last = (await db.execute(select(
+            select(func.min(_jobs.c.fair_at)).where(queued).scalar_subquery(),
+            select(func.max(_jobs.c.fair_at)).where(queued, _jobs.c.tenant == tenant).scalar_subquery(),
+        ))).one()
+        start = max(head or 0.0, last or 0.0)
+        step = 1.0 / self.weights.get(tenant, 1.0)
+        return [start + step * (i + 1) for i in range(count)]
+
+    async def enqueue(self, kind, payload, key=None, delay=0.0, max_attempts=None, lane="batch", tenant=None):
+        priority, tenant = _priority(lane), tenant or "default"
+        job_id = uuid.uuid4().hex
+        async with self._session() as db:
+            [fair_at] = await self._fair_tags(db, priority, tenant, 1)
+            db.add(JobRow(
+                id=job_id, kind=kind, key=key, payload=payload, status="queued", attempts=0,
+                max_attempts=max_attempts or self.max_attempts, available_at=time.time() + delay,
+                priority=priority, tenant=tenant, fair_at=fair_at,
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                return None
+        self._wakeup.set()
+        return job_id
+
+    async def enqueue_many(self, kind, payloads, keys=None, lane="batch", tenant=None):
+        if not payloads:
+            return []
+        priority, tenant = _priority(lane), tenant or "default"
+        keys = keys or [None] * len(payloads)
+        now = time.time()
+        async with self._session() as db:
+            dialect = db.bind.dialect.name
+            if dialect not in _UPSERT_DIALECTS:
+                return await super().enqueue_many(kind, payloads, keys, lane, tenant)
+            tags = await self._fair_tags(db, priority, tenant, len(payloads))
+            rows = [
+                {"id": uuid.uuid4().hex, "kind": kind, "key": key, "payload": payload, "status": "queued",
+                 "attempts": 0, "max_attempts": self.max_attempts, "available_at": now,
+                 "priority": priority, "tenant": tenant, "fair_at": fair_at}
+                for payload, key, fair_at in zip(payloads, keys, tags)
+            ]
+            # Rows whose key is already active are skipped, not an error for the batch
+            await db.execute(_UPSERT_DIALECTS[dialect](_jobs).on_conflict_do_nothing(), rows)
+            added = set((await db.execute(
+                select(_jobs.c.id).where(_jobs.c.id.in_([row["id"] for row in rows]))
+            )).scalars())
+            await db.commit()
+        self._wakeup.set()
+        return [row["id"] if row["id"] in added else None for row in rows]
+
+    async def claim(self, worker, limit, lease, wait=0.0):
+        self._wakeup.clear()
+        jobs = await self._claim(worker, limit, lease)
+        if not jobs and wait > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                return []
+            jobs = await self._claim(worker, limit, lease)
+        return jobs
+
+    async def _claim(self, worker: str, limit: int, lease: float) -> List[Job]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        due = (
+            select(_jobs.c.id)
+            .where(or_(
+                and_(_jobs.c.status == "queued", _jobs.c.available_at <= now),
+                and_(_jobs.c.status == "leased", _jobs.c.lease_expires_at <= now),
+            ))
+            .order_by(_jobs.c.priority, _jobs.c.fair_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with self._session() as db:
+            await db.execute(
+                update(_jobs).where(_jobs.c.id.in_(due)).values(
+                    status="leased", lease_token=token, lease_expires_at=now + lease,
+                    worker=worker, attempts=_jobs.c.attempts + 1,
+                )
+            )
+            rows = (await db.execute(select(_jobs).where(_jobs.c.lease_token == token))).all()
+            await db.commit()
+
+        jobs = []
+        for row in rows:
+            job = Job(row.id, row.kind, row.payload, row.key, row.attempts, row.max_attempts,
+                      worker, token, row.last_error, LANES[row.priority])
+            if job.attempts > job.max_attempts:
+                # Its last worker died holding it
+                await self.bury(job, job.error or "Lease expired on the final attempt")
+            else:
+                jobs.append(job)
+        return jobs
+
+    def _held(self, job: Job):
+        return and_(_jobs.c.id == job.id, _jobs.c.lease_token == job.receipt)
+
+    async def extend(self, job, lease):
+        async with self._session() as db:
+            result = await db.execute(
+                update(_jobs).where(self._held(job)).values(lease_expires_at=time.time() + lease)
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def complete(self, job):
+        async with self._session() as db:
+            await db.execute(delete(_jobs).where(self._held(job)))
+            await db.commit()
+
+    async def _requeue(self, job, attempts, delay, error):
+        async with self._session() as db:
+            await db.execute(update(_jobs).where(self._held(job)).values(
+                status="queued", attempts=attempts, available_at=time.time() + delay, last_error=error,
+                lease_token=None, lease_expires_at=None, worker=None,
+            ))
+            await db.commit()
+        if delay <= 0:
+            self._wakeup.set()
+
+    async def _bury(self, job, error):
+        async with self._session() as db:
+            await db.execute(update(_jobs).where(self._held(job)).values(
+                status="dead", last_error=error, lease_token=None, lease_expires_at=None,
+            ))
+            await db.commit()
+
+    async def is_active(self, key):
+        async with self._session() as db:
+            result = await db.execute(
+                select(_jobs.c.id).where(_jobs.c.key == key, _jobs.c.status.in_(_ACTIVE)).limit(1)
+            )
+            return result.first() is not None
+
+    async def dead_letters(self, limit=100):
+        async with self._session() as db:
+            result = await db.execute(
+                select(_jobs).where(_jobs.c.status == "dead").order_by(_jobs.c.created_at.desc()).limit(limit)
+            )
+            return [
+                {"id": row.id, "kind": row.kind, "key": row.key, "lane": LANES[row.priority],
+                 "tenant": row.tenant, "payload": row.payload, "attempts": row.attempts,
+                 "error": row.last_error, "worker": row.worker}
+                for row in result
+            ]
+
+    async def requeue_dead(self, job_id):
+        async with self._session() as db:
+            try:
+                result = await db.execute(
+                    update(_jobs).where(_jobs.c.id == job_id, _jobs.c.status == "dead").values(
+                        status="queued", attempts=0, available_at=time.time(), worker=None,
+                    )
+                )
+                await db.commit()
+            except IntegrityError:
+                # Another job with the same key is active
+                return False
+        self._wakeup.set()
+        return result.rowcount == 1
+
+    async def stats(self):
+        async with self._session() as db:
+            result = await db.execute(select(_jobs.c.status, func.count()).group_by(_jobs.c.status))
+            counts = dict(result.all())
+        return {"backend": "sql", **{status: counts.get(status, 0) for status in ("queued", "leased", "dead")}}
+
+
+# KEYS = lane stream, delayed set, dedupe marker; ARGV = job json, job id,
+# due time (0 = now), "1" to dedupe on the marker
+_ENQUEUE_LUA = """
+if ARGV[4] == '1' and not redis.call('SET', KEYS[3], ARGV[2], 'NX') then
+  return 0
+end
+if tonumber(ARGV[3]) > 0 then
+  redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+else
+  redis.call('XADD', KEYS[1], '*', 'job', ARGV[1])
+end
+return 1
+"""
+
+# KEYS = delayed set, then one stream per lane; ARGV = now, max jobs, then the
+# lane names in the same order. Moves due retries onto their lane's stream
+_PROMOTE_LUA = """
+local streams = {}
+for i = 3, #ARGV do streams[ARGV[i]] = KEYS[i - 1] end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, body in ipairs(due) do
+  redis.call('ZREM', KEYS[1], body)
+  redis.call('XADD', streams[cjson.decode(body)['lane']] or KEYS[#KEYS], '*', 'job', body)
+end
+return #due
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Jobs as entries of one Redis stream per lane, each read through a
+    consumer group. The consumer group's pending list is the lease: a worker
+    renews it by re-claiming its entries, and entries idle for longer than
+    the lease are taken over with XAUTOCLAIM. Retries wait in a sorted set
+    until due; dead letters are kept in a hash by job id. Lanes are read in
+    priority order, but jobs within a lane are FIFO; tenants are not
+    weighted.
+    """
+
+    def __init__(self, client_factory, prefix: str = "jobs:", group: str = "workers", **options):
+        super().__init__(**options)
+        self._client_factory = client_factory
+        self.streams = {lane: f"{prefix}stream:{lane}" for lane in LANES}
+        self.delayed = prefix + "delayed"
+        self.dead = prefix + "dead"
+        self.keys = prefix + "key:"
+        self.group = group
+        self._client = None
+        self._enqueue_script = None
+        self._promote_script = None
+
+    async def _redis(self):
+        if self._client is None:
+            from redis.exceptions import ResponseError
+            client = await self._client_factory()
+            for stream in self.streams.values():
+                try:
+                    await client.xgroup_create(stream, self.group, id="0", mkstream=True)
+                except ResponseError as e:
+                    if "BUSYGROUP" not in str(e):
+                        raise
+            self._enqueue_script = client.register_script(_ENQUEUE_LUA)
+            self._promote_script = client.register_script(_PROMOTE_LUA)
+            self._client = client
+        return self._client
+
+    async def _add(self, data: dict, delay: float = 0.0, dedupe: bool = False) -> bool:
+        await self._redis()
+        added = await self._enqueue_script(
+            keys=[self.streams[data["lane"]], self.delayed, self.keys + (data["key"] or "")],
+            args=[json.dumps(data), data["id"], time.time() + delay if delay > 0 else 0, "1" if dedupe else "0"],
+        )
+        return bool(int(added))
+
+    async def enqueue(self, kind, payload, key=None, delay=0.0, max_attempts=None, lane="batch", tenant=None):
+        _priority(lane)
+        data = {"id": uuid.uuid4().hex, "kind": kind, "key": key, "lane": lane, "payload": payload,
+                "attempts": 0, "max_attempts": max_attempts or self.max_attempts, "error": None}
+        if not await self._add(data, delay, dedupe=key is not None):
+            return None
+        return data["id"]
+
+    def _job(self, entry_id, fields, deliveries: int, worker: str) -> Optional[Job]:
+        body = fields.get(b"job") or fields.get("job") if fields else None
+        if body is None:
+            return None
+        data = json.loads(body)
+        return Job(data["id"], data["kind"], data["payload"], data["key"], data["attempts"] + deliveries,
+                   data["max_attempts"], worker, entry_id, data["error"], data.get("lane", "batch"))
+
+    async def _read(self, client, worker: str, limit: int) -> List[Job]:
+        jobs = []
+        for stream in self.streams.values():
+            if len(jobs) >= limit:
+                break
+            response = await client.xreadgroup(self.group, worker, {stream: ">"}, count=limit - len(jobs))
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    job = self._job(entry_id, fields, 1, worker)
+                    if job is not None:
+                        jobs.append(job)
+        return jobs
+
+    async def claim(self, worker, limit, lease, wait=0.0):
+        client = await self._redis()
+        await self._promote_script(keys=[self.delayed, *self.streams.values()], args=[time.time(), 100, *LANES])
+
+        jobs = []
+        # Entries whose worker stopped renewing the lease
+        for stream in self.streams.values():
+            if len(jobs) >= limit:
+                break
+            reclaimed = await client.xautoclaim(stream, self.group, worker, int(lease * 1000), "0-0",
+                                                count=limit - len(jobs))
+            for entry_id, fields in reclaimed[1]:
+                pending = await client.xpending_range(stream, self.group, entry_id, entry_id, 1)
+                job = self._job(entry_id, fields, pending[0]["times_delivered"] if pending else 1, worker)
+                if job is None:
+                    continue
+                if job.attempts > job.max_attempts:
+                    await self.bury(job, job.error or "Lease expired on the final attempt")
+                else:
+                    jobs.append(job)
+
+        if len(jobs) < limit:
+            jobs += await self._read(client, worker, limit - len(jobs))
+        if not jobs and wait > 0:
+            # XREAD (not the group) only to wait for a new entry on any lane,
+            # so the group read that follows still takes lanes in order
+            if await client.xread({stream: "$" for stream in self.streams.values()}, count=1,
+                                  block=int(wait * 1000)):
+                jobs = await self._read(client, worker, limit)
+        return jobs
+
+    async def extend(self, job, lease):
+        client = await self._redis()
+        stream = self.streams[job.lane]
+        pending = await client.xpending_range(stream, self.group, job.receipt, job.receipt, 1)
+        if not pending or pending[0]["consumer"] not in (job.worker, job.worker.encode()):
+            return False
+        # Re-claiming resets the entry's idle time
+        await client.xclaim(stream, self.group, job.worker, 0, [job.receipt], justid=True)
+        return True
+
+    def _data(self, job: Job, attempts: int, error: Optional[str]) -> dict:
+        return {"id": job.id, "kind": job.kind, "key": job.key, "lane": job.lane, "payload": job.payload,
+                "attempts": attempts, "max_attempts": job.max_attempts, "error": error}
+
+    async def complete(self, job):
+        client = await self._redis()
+        stream = self.streams[job.lane]
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, self.group, job.receipt).xdel(stream, job.receipt)
+            if job.key is not None:
+                pipe.delete(self.keys + job.key)
+            await pipe.execute()
+
+    async def _requeue(self, job, attempts, delay, error):
+        client = await self._redis()
+        stream = self.streams[job.lane]
+        body = json.dumps(self._data(job, attempts, error))
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, self.group, job.receipt).xdel(stream, job.receipt)
+            if delay > 0:
+                pipe.zadd(self.delayed, {body: time.time() + delay})
+            else:
+                pipe.xadd(stream, {"job": body})
+            await pipe.execute()
+
+    async def _bury(self, job, error):
+        client = await self._redis()
+        stream = self.streams[job.lane]
+        data = {**self._data(job, job.attempts, error), "worker": job.worker, "failed_at": time.time()}
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, self.group, job.receipt).xdel(stream, job.receipt)
+            pipe.hset(self.dead, job.id, json.dumps(data))
+            if job.key is not None:
+                pipe.delete(self.keys + job.key)
+            await pipe.execute()
+
+    async def is_active(self, key):
+        client = await self._redis()
+        return bool(await client.exists(self.keys + key))
+
+    async def dead_letters(self, limit=100):
+        client = await self._redis()
+        dead = [json.loads(body) for body in (await client.hgetall(self.dead)).values()]
+        dead.sort(key=lambda data: data["failed_at"], reverse=True)
+        return dead[:limit]
+
+    async def requeue_dead(self, job_id):
+        client = await self._redis()
+        body = await client.hget(self.dead, job_id)
+        if body is None:
+            return False
+        data = json.loads(body)
+        data.pop("worker", None)
+        data.pop("failed_at", None)
+        if not await self._add({"lane": "batch", **data, "attempts": 0}, dedupe=data["key"] is not None):
+            return False
+        await client.hdel(self.dead, job_id)
+        return True
+
+    async def stats(self):
+        client = await self._redis()
+        async with client.pipeline(transaction=False) as pipe:
+            for stream in self.streams.values():
+                pipe.xlen(stream).xpending(stream, self.group)
+            pipe.zcard(self.delayed).hlen(self.dead)
+            *lanes, delayed, dead = await pipe.execute()
+        length = sum(lanes[0::2])
+        leased = sum(pending["pending"] for pending in lanes[1::2])
+        return {"backend": "redis", "queued": length - leased + delayed, "leased": leased, "dead": dead}
+
+
+def create_job_queue() -> JobQueue:
+    options = dict(
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_base_delay=settings.JOB_RETRY_BASE_DELAY,
+        retry_max_delay=settings.JOB_RETRY_MAX_DELAY,
+        weights=settings.TASK_QUEUE_TENANT_WEIGHTS,
+    )
+    if settings.JOB_QUEUE_BACKEND == "redis":
+        from app.utils.redis_manager import get_redis
+        return RedisJobQueue(get_redis, **options)
+    if settings.JOB_QUEUE_BACKEND == "sql":
+        return SQLJobQueue(**options)
+    raise ValueError(f"Unknown job queue backend: {settings.JOB_QUEUE_BACKEND}")
+
+
+job_queue = create_job_queue()
@@ -0,0 +1,209 @@
+"""
+Low-overhead in-process metrics. Hot paths only bump pre-allocated
+counters and histogram buckets (no locks: everything runs on the event
+loop); gauges are computed by callbacks when the metrics are scraped.
+"""
+import asyncio
+import bisect
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond scheduling up to multi-minute backlogs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is O(log buckets) and allocation free."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        cumulative, total = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            cumulative[str(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class LoopLagMonitor:
+    """
+    Samples event-loop lag: how late a ``sleep(interval)`` wakes up. Anything
+    blocking the loop (sync disk I/O, CPU-bound work) shows up as lag.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lag = Histogram((0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.lag.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+LabelValues = Tuple[str, ...]
+
+
+class MetricFamily:
+    """
+    A named metric and its children, one per combination of label values.
+    ``collect`` families read existing Counters/Histograms or gauge values
+    from a callback instead of owning children.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 collect: Optional[Callable[[], Dict[LabelValues, object]]] = None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.collect = collect
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+            self._children[values] = child
+        return child
+
+    def samples(self) -> Dict[LabelValues, object]:
+        if self.collect is not None:
+            return self.collect()
+        return dict(self._children)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isfinite(value) and value == int(value):
+        return str(int(value))
+    return repr(value).replace("inf", "Inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def _add(self, family: MetricFamily) -> MetricFamily:
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, help, "counter", labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._add(MetricFamily(name, help, "histogram", labels, buckets))
+
+    def gauge(self, name: str, help: str, collect: Callable[[], Dict[LabelValues, float]],
+              labels: Sequence[str] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, help, "gauge", labels, collect=collect))
+
+    def histogram_source(self, name: str, help: str, collect: Callable[[], Dict[LabelValues, Histogram]],
+                         labels: Sequence[str] = ()) -> MetricFamily:
+        """Expose Histograms owned elsewhere (e.g. task queue lanes)."""
+        return self._add(MetricFamily(name, help, "histogram", labels, collect=collect))
+
+    def _collect(self, family: MetricFamily) -> Dict[LabelValues, object]:
+        try:
+            return family.samples()
+        except Exception:
+            # A failing gauge callback must not break the whole scrape
+            return {}
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for f in self._families.values():
+            lines.append(f"# HELP {f.name} {f.help}")
+            lines.append(f"# TYPE {f.name} {f.kind}")
+            for values, sample in self._collect(f).items():
+                if isinstance(sample, Histogram):
+                    total = 0
+                    for bound, n in zip(sample.buckets, sample.counts):
+                        total += n
+                        le = _labels(f.label_names, values, f'le="{bound}"')
+                        lines.append(f"{f.name}_bucket{le} {total}")
+                    le = _labels(f.label_names, values, 'le="+Inf"')
+                    lines.append(f"{f.name}_bucket{le} {sample.count}")
+                    lines.append(f"{f.name}_sum{_labels(f.label_names, values)} {_number(sample.sum)}")
+                    lines.append(f"{f.name}_count{_labels(f.label_names, values)} {sample.count}")
+                else:
+                    value = sample.value if isinstance(sample, Counter) else sample
+                    lines.append(f"{f.name}{_labels(f.label_names, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        out = {}
+        for f in self._families.values():
+            series = []
+            for values, sample in self._collect(f).items():
+                entry = {"labels": dict(zip(f.label_names, values))}
+                if isinstance(sample, Histogram):
+                    entry.update(sample.snapshot())
+                else:
+                    entry["value"] = sample.value if isinstance(sample, Counter) else sample
+                series.append(entry)
+            out[f.name] = {"type": f.kind, "help": f.help, "series": series}
+        return out
+
+
+metrics = MetricsRegistry()
+
+loop_lag_monitor = LoopLagMonitor(interval=0.5)
+metrics.histogram_source(
+    "event_loop_lag_seconds", "How late the event loop wakes up a periodic sleep",
+    lambda: {(): loop_lag_monitor.lag},
+)
+metrics.gauge(
+    "event_loop_lag_max_seconds", "Largest event loop lag seen since start",
+    lambda: {(): loop_lag_monitor.max_lag},
+)
@@ -0,0 +1,209 @@
+"""
+Transports that carry stream events between StreamManager instances.
+
+``LocalStreamBackend`` delivers in-process only. ``PubSubStreamBackend``
+publishes each event once to a Redis channel per run; every process
+subscribes to the channels of runs it has sockets for and fans out locally,
+so a client sees events no matter which worker produced them. It can also
+keep the most recent events of each run in a Redis list so any node can
+replay them to late subscribers.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.utils.logger import logger
+
+Deliver = Callable[[str, int, str], None]
+
+
+class StreamBackend(ABC):
+    def bind(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    def publish(self, run_id: str, seq: int, text: str):
+        """Send a serialized event to every node; must preserve call order."""
+
+    async def history(self, run_id: str) -> List[Tuple[int, str]]:
+        """Persisted recent events of a run, if the backend keeps any."""
+        return []
+
+    async def watch(self, run_id: str):
+        """Called when this node gets its first local subscriber for ``run_id``."""
+
+    async def unwatch(self, run_id: str):
+        """Called when this node's last local subscriber for ``run_id`` leaves."""
+
+
+class LocalStreamBackend(StreamBackend):
+    def publish(self, run_id, seq, text):
+        self._deliver(run_id, seq, text)
+
+
+class PubSubStreamBackend(StreamBackend):
+    """
+    Redis pub/sub transport. ``client_factory`` returns a redis.asyncio
+    client, or anything with the same ``publish``/``pubsub`` surface such as
+    MemoryPubSub.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Awaitable],
+        prefix: str = "stream:",
+        history_size: int = 0,
+        history_ttl: int = 3600,
+    ):
+        self.client_factory = client_factory
+        self.prefix = prefix
+        # Events kept per run in the "<prefix>log:<run_id>" list; 0 disables
+        self.history_size = history_size
+        self.history_ttl = history_ttl
+        self.client = None
+        self.pubsub = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    async def start(self):
+        if self.client is not None:
+            return
+        self.client = await self.client_factory()
+        self.pubsub = self.client.pubsub()
+        # A control channel keeps the pubsub connection open with no runs watched
+        await self.pubsub.subscribe(self.prefix + "__control__")
+        self._outbox = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._listener())]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        self.client = self.pubsub = None
+
+    def publish(self, run_id, seq, text):
+        if self._outbox is None:
+            raise RuntimeError("Stream backend not started")
+        # One publisher task drains this queue so events keep their order
+        self._outbox.put_nowait((run_id, f"{seq}\n{text}"))
+
+    async def history(self, run_id):
+        if not self.history_size:
+            return []
+        return [self._decode(m) for m in await self.client.lrange(self._log_key(run_id), 0, -1)]
+
+    def _log_key(self, run_id: str) -> str:
+        return f"{self.prefix}log:{run_id}"
+
+    @staticmethod
+    def _decode(message) -> Tuple[int, str]:
+        # Wire format is "<seq>\n<json>"; serialized JSON never contains a raw newline
+        message = message.decode() if isinstance(message, bytes) else message
+        seq, _, text = message.partition("\n")
+        return int(seq), text
+
+    async def watch(self, run_id):
+        await self.pubsub.subscribe(self.prefix + run_id)
+
+    async def unwatch(self, run_id):
+        await self.pubsub.unsubscribe(self.prefix + run_id)
+
+    async def _publisher(self):
+        while True:
+            run_id, message = await self._outbox.get()
+            try:
+                await self.client.publish(self.prefix + run_id, message)
+                if self.history_size:
+                    key = self._log_key(run_id)
+                    await self.client.rpush(key, message)
+                    await self.client.ltrim(key, -self.history_size, -1)
+                    await self.client.expire(key, self.history_ttl)
+            except Exception:
+                logger.exception("Failed to publish stream event for %s", run_id)
+
+    async def _listener(self):
+        while True:
+            try:
+                msg = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Stream pub/sub listener error")
+                await asyncio.sleep(1.0)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            channel = msg["channel"]
+            channel = channel.decode() if isinstance(channel, bytes) else channel
+            seq, text = self._decode(msg["data"])
+            self._deliver(channel[len(self.prefix):], seq, text)
+
+
+class MemoryPubSub:
+    """
+    In-process stand-in for the subset of redis.asyncio used above. Several
+    StreamManagers sharing one instance behave like nodes sharing a Redis.
+    """
+
+    def __init__(self):
+        self._channels: Dict[str, Set["_MemorySubscription"]] = defaultdict(set)
+        self._lists: Dict[str, list] = defaultdict(list)
+
+    async def publish(self, channel: str, data: str) -> int:
+        subs = list(self._channels.get(channel, ()))
+        for sub in subs:
+            sub.queue.put_nowait({"type": "message", "channel": channel.encode(), "data": data.encode()})
+        return len(subs)
+
+    async def rpush(self, key: str, value: str) -> int:
+        self._lists[key].append(value.encode())
+        return len(self._lists[key])
+
+    async def ltrim(self, key: str, start: int, end: int):
+        items = self._lists[key]
+        self._lists[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    async def lrange(self, key: str, start: int, end: int) -> list:
+        items = self._lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    async def expire(self, key: str, seconds: int):
+        pass
+
+    def pubsub(self) -> "_MemorySubscription":
+        return _MemorySubscription(self)
+
+
+class _MemorySubscription:
+    def __init__(self, broker: MemoryPubSub):
+        self.broker = broker
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str):
+        for ch in channels:
+            self.channels.add(ch)
+            self.broker._channels[ch].add(self)
+
+    async def unsubscribe(self, *channels: str):
+        for ch in channels:
+            self.channels.discard(ch)
+            self.broker._channels[ch].discard(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        await self.unsubscribe(*list(self.channels))
@@ -1,29 +1,319 @@
 import asyncio
-from typing import Dict, Set
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
 from fastapi import WebSocket
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.stream_backends import StreamBackend, LocalStreamBackend, PubSubStreamBackend
+
+_SEND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+send_seconds = metrics.histogram(
+    "stream_send_seconds", "Time to write one event to a WebSocket", buckets=_SEND_BUCKETS,
+).labels()
+delivery_seconds = metrics.histogram(
+    "stream_delivery_seconds", "Time from broadcast to the event being written to a WebSocket",
+    buckets=_SEND_BUCKETS,
+).labels()
+dropped_events = metrics.counter(
+    "stream_dropped_events_total", "Events dropped for slow subscribers",
+).labels()
+
+
+def _dumps(payload: dict) -> str:
+    # Same encoding as WebSocket.send_json
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+class EventLog:
+    """
+    Bounded ring buffer of recent ``(seq, text)`` events per run, for the
+    ``max_runs`` most recently active runs.
+    """
+
+    def __init__(self, size: int = 1000, max_runs: int = 1000):
+        self.size = size
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, Deque[Tuple[int, str]]]" = OrderedDict()
+
+    def _ring(self, run_id: str) -> Deque[Tuple[int, str]]:
+        ring = self._runs.get(run_id)
+        if ring is None:
+            ring = self._runs[run_id] = deque(maxlen=self.size)
+            if len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        else:
+            self._runs.move_to_end(run_id)
+        return ring
+
+    def last_seq(self, run_id: str) -> int:
+        ring = self._runs.get(run_id)
+        return ring[-1][0] if ring else 0
+
+    def append(self, run_id: str, seq: int, text: str):
+        ring = self._ring(run_id)
+        if not ring or seq > ring[-1][0]:
+            ring.append((seq, text))
+
+    def merge(self, run_id: str, events: Iterable[Tuple[int, str]]):
+        ring = self._ring(run_id)
+        merged = dict(ring)
+        merged.update(events)
+        ring.clear()
+        ring.extend(sorted(merged.items())[-self.size:])
+
+    def covers(self, run_id: str, after: int) -> bool:
+        """True if every event after ``after`` that this node saw is still buffered."""
+        ring = self._runs.get(run_id)
+        return bool(ring) and (ring[0][0] <= after or after >= ring[-1][0])
+
+    def since(self, run_id: str, after: int) -> List[Tuple[int, str]]:
+        ring = self._runs.get(run_id)
+        return [e for e in ring if e[0] > after] if ring else []
+
+
+class _Subscriber:
+    """
+    One client with its own bounded outbound queue of ``(seq, text)``. Socket
+    subscribers have a writer task draining it; SSE responses drain it
+    themselves.
+    """
+
+    def __init__(self, key: Any, maxsize: int, ws: Optional[WebSocket] = None):
+        self.key = key
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def lagging(self) -> bool:
+        return self.dropped > 0
+
+    def take_lag_notice(self) -> Optional[str]:
+        if not self.dropped:
+            return None
+        dropped, self.dropped = self.dropped, 0
+        return _dumps({"event": "lagged", "dropped": dropped})
+
 
 class StreamManager:
-    def __init__(self):
-        self._subs: Dict[str, Set[WebSocket]] = {}
+    """
+    Fans events out to WebSocket and SSE subscribers per run / thread.
+
+    ``broadcast`` stamps a payload with a sequence number (``seq``),
+    serializes it once and enqueues it for every subscriber without waiting
+    on any socket, so one slow client cannot hold up the others or the
+    producer. When a subscriber's queue is full the ``slow_policy`` decides:
+    ``"drop_oldest"`` discards its oldest pending event and tells the client
+    how many it missed, ``"disconnect"`` closes the connection. Consecutive
+    ``token`` events are coalesced for up to ``batch_window`` seconds or
+    ``batch_max`` tokens into one event.
+
+    Recent events are kept per run so a subscriber that passes the last
+    ``seq`` it saw gets everything after it replayed before live events.
+
+    Events travel through ``backend`` before local fan-out, so with a
+    pub/sub backend every process sees every event for the runs its
+    sockets are subscribed to.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        slow_policy: str = "drop_oldest",
+        batch_window: float = 0.02,
+        batch_max: int = 64,
+        backend: Optional[StreamBackend] = None,
+        replay_size: int = 1000,
+        replay_runs: int = 1000,
+    ):
+        if slow_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_policy}")
+        self.queue_size = queue_size
+        self.slow_policy = slow_policy
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.log = EventLog(replay_size, replay_runs)
+        self._subs: Dict[str, Dict[Any, _Subscriber]] = {}
+        self._tokens: Dict[str, List[str]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
         self._lock = asyncio.Lock()
+        self.backend = backend or LocalStreamBackend()
+        self.backend.bind(self._deliver)
+
+    async def start(self):
+        await self.backend.start()
+
+    async def stop(self):
+        await self.backend.stop()
 
-    async def connect(self, run_id: str, ws: WebSocket):
+    # ---- subscribing ----
+
+    async def subscribe(self, run_id: str, last_event_id: Optional[int] = None,
+                        ws: Optional[WebSocket] = None) -> _Subscriber:
+        """
+        Register a subscriber. With ``last_event_id`` the buffered events
+        after it are queued first, with no gap before live events.
+        """
         async with self._lock:
-            self._subs.setdefault(run_id, set()).add(ws)
+            if run_id not in self._subs:
+                await self.backend.watch(run_id)
+            replay = []
+            if last_event_id is not None:
+                if not self.log.covers(run_id, last_event_id):
+                    self.log.merge(run_id, await self.backend.history(run_id))
+                replay = self.log.since(run_id, last_event_id)
+            # No await between snapshotting the replay and registering
+            sub = _Subscriber(ws if ws is not None else object(), self.queue_size + len(replay), ws)
+            for event in replay:
+                sub.queue.put_nowait(event)
+            self._subs.setdefault(run_id, {})[sub.key] = sub
+        return sub
 
-    async def disconnect(self, run_id: str, ws: WebSocket):
+    async def unsubscribe(self, run_id: str, sub: _Subscriber):
         async with self._lock:
-            if run_id in self._subs:
-                self._subs[run_id].discard(ws)
-                if not self._subs[run_id]:
-                    del self._subs[run_id]
+            removed = self._remove(run_id, sub.key)
+            if removed and run_id not in self._subs:
+                await self.backend.unwatch(run_id)
+        if removed and removed.task and removed.task is not asyncio.current_task():
+            removed.task.cancel()
+
+    async def connect(self, run_id: str, ws: WebSocket, last_event_id: Optional[int] = None):
+        sub = await self.subscribe(run_id, last_event_id, ws=ws)
+        sub.task = asyncio.create_task(self._writer(run_id, sub))
+
+    async def disconnect(self, run_id: str, ws: WebSocket):
+        sub = self._subs.get(run_id, {}).get(ws)
+        if sub:
+            await self.unsubscribe(run_id, sub)
+
+    def _remove(self, run_id: str, key: Any) -> Optional[_Subscriber]:
+        subs = self._subs.get(run_id)
+        if not subs:
+            return None
+        sub = subs.pop(key, None)
+        if not subs:
+            del self._subs[run_id]
+        return sub
+
+    def subscriber_count(self, run_id: str) -> int:
+        return len(self._subs.get(run_id, ()))
+
+    # ---- publishing ----
 
     async def broadcast(self, run_id: str, payload: dict):
-        conns = list(self._subs.get(run_id, []))
-        for ws in conns:
+        if self.batch_window > 0 and payload.get("event") == "token" and payload.keys() == {"event", "content"}:
+            buf = self._tokens.setdefault(run_id, [])
+            buf.append(payload["content"])
+            if len(buf) >= self.batch_max:
+                self._flush_tokens(run_id)
+            elif run_id not in self._flush_handles:
+                loop = asyncio.get_running_loop()
+                self._flush_handles[run_id] = loop.call_later(self.batch_window, self._flush_tokens, run_id)
+            return
+        # Anything else goes out after the tokens that preceded it
+        self._flush_tokens(run_id)
+        self._emit(run_id, payload)
+
+    def _flush_tokens(self, run_id: str):
+        handle = self._flush_handles.pop(run_id, None)
+        if handle:
+            handle.cancel()
+        buf = self._tokens.pop(run_id, None)
+        if buf:
+            self._emit(run_id, {"event": "token", "content": "".join(buf)})
+
+    def _emit(self, run_id: str, payload: dict):
+        # Microsecond-based so ids stay increasing across restarts
+        seq = max(self.log.last_seq(run_id) + 1, time.time_ns() // 1000)
+        text = _dumps({**payload, "seq": seq})
+        self.log.append(run_id, seq, text)
+        self.backend.publish(run_id, seq, text)
+
+    def _deliver(self, run_id: str, seq: int, text: str):
+        """Fan an already-serialized event out to this process's subscribers."""
+        self.log.append(run_id, seq, text)
+        for sub in list(self._subs.get(run_id, {}).values()):
             try:
-                await ws.send_json(payload)
-            except Exception:
-                pass
+                sub.queue.put_nowait((seq, text))
+            except asyncio.QueueFull:
+                if self.slow_policy == "disconnect":
+                    self._drop(run_id, sub)
+                    continue
+                sub.queue.get_nowait()
+                sub.dropped += 1
+                dropped_events.inc()
+                sub.queue.put_nowait((seq, text))
+
+    def _drop(self, run_id: str, sub: _Subscriber):
+        self._remove(run_id, sub.key)
+        sub.closed = True
+        if sub.task:
+            sub.task.cancel()
+        if sub.ws is not None:
+            asyncio.create_task(self._close(sub.ws, 1013, "Consumer too slow"))
+        if run_id not in self._subs:
+            asyncio.create_task(self.backend.unwatch(run_id))
+
+    async def _writer(self, run_id: str, sub: _Subscriber):
+        try:
+            while True:
+                seq, text = await sub.queue.get()
+                notice = sub.take_lag_notice()
+                if notice:
+                    await sub.ws.send_text(notice)
+                started = time.perf_counter()
+                await sub.ws.send_text(text)
+                send_seconds.observe(time.perf_counter() - started)
+                # seq is the broadcast time in microseconds (see _emit)
+                delivery_seconds.observe(max(0.0, time.time() - seq / 1e6))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead socket: prune it instead of failing every future broadcast
+            logger.info("Dropping subscriber of %s: %s", run_id, e)
+            await self.unsubscribe(run_id, sub)
+
+    @staticmethod
+    async def _close(ws: WebSocket, code: int, reason: str):
+        try:
+            await ws.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+def _create_backend() -> StreamBackend:
+    if settings.STREAM_BACKEND == "redis":
+        from app.utils.redis_manager import get_redis
+        return PubSubStreamBackend(
+            get_redis,
+            history_size=settings.STREAM_REPLAY_SIZE if settings.STREAM_REPLAY_PERSIST else 0,
+        )
+    if settings.STREAM_BACKEND == "local":
+        return LocalStreamBackend()
+    raise ValueError(f"Unknown stream backend: {settings.STREAM_BACKEND}")
+
+
+stream_manager = StreamManager(
+    queue_size=settings.STREAM_QUEUE_SIZE,
+    slow_policy=settings.STREAM_SLOW_CONSUMER_POLICY,
+    batch_window=settings.STREAM_BATCH_WINDOW,
+    batch_max=settings.STREAM_BATCH_MAX_TOKENS,
+    backend=_create_backend(),
+    replay_size=settings.STREAM_REPLAY_SIZE,
+    replay_runs=settings.STREAM_REPLAY_RUNS,
+)
 
-stream_manager = StreamManager()
+# Summed over runs: a run_id label would add a series for every run ever streamed
+metrics.gauge(
+    "stream_subscribers", "Active stream subscribers across all runs",
+    lambda: {(): sum(len(subs) for subs in stream_manager._subs.values())},
+)
+metrics.gauge(
+    "stream_runs_subscribed", "Runs with at least one active stream subscriber",
+    lambda: {(): sum(1 for subs in stream_manager._subs.values() if subs)},
+)
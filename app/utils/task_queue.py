@@ -1,26 +1,197 @@
 import asyncio
-from typing import Callable, Any
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Callable, Any, Deque, Dict, List, Optional
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import Histogram, metrics
+
+# Highest priority first; a lane is only served when every lane above it is empty
+LANES = ("interactive", "batch")
+
+
+class QueueFull(Exception):
+    """Raised when a task cannot be queued before the put timeout expires."""
+
+
+class _Task:
+    __slots__ = ("coro", "args", "kwargs", "key", "lane", "tenant", "weight", "enqueued_at")
+
+    def __init__(self, coro, args, kwargs, key, lane, tenant, weight):
+        self.coro = coro
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.lane = lane
+        self.tenant = tenant
+        self.weight = weight
+        self.enqueued_at = time.monotonic()
+
+
+class _Lane:
+    """
+    Weighted fair queue across tenants: each task gets a virtual finish tag of
+    ``max(vtime, tenant's last tag) + 1 / weight`` and the smallest tag runs next.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.heap: list = []
+        self.vtime = 0.0
+        self.finish: Dict[str, float] = {}
+        self.wait_time = Histogram()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, task: _Task):
+        tag = max(self.vtime, self.finish.get(task.tenant, 0.0)) + 1.0 / task.weight
+        self.finish[task.tenant] = tag
+        heapq.heappush(self.heap, (tag, next(self._seq), task))
+
+    def pop(self) -> _Task:
+        tag, _, task = heapq.heappop(self.heap)
+        self.vtime = tag
+        if not self.heap:
+            self.finish.clear()
+        self.wait_time.observe(time.monotonic() - task.enqueued_at)
+        return task
+
 
 class TaskQueue:
-    def __init__(self):
-        self.queue = asyncio.Queue()
+    """
+    Bounded async task queue drained by a pool of worker tasks.
+
+    Tasks are scheduled by lane priority, then fairly across tenants within a
+    lane. Tasks sharing a ``key`` (e.g. a chat thread id) run strictly in the
+    order they were added; tasks with different keys run in parallel.
+    """
+
+    def __init__(self, workers: int = 4, maxsize: int = 1000, weights: Optional[Dict[str, float]] = None):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.weights = weights or {}
+        self.lanes = {name: _Lane(name) for name in LANES}
         self.is_running = False
+        self._slots = asyncio.Semaphore(maxsize)
+        self._ready = asyncio.Semaphore(0)
+        self._waiting = 0
+        # key -> tasks waiting for the in-flight task with the same key
+        self._keyed: Dict[str, Deque[_Task]] = {}
+        self._tasks: List[asyncio.Task] = []
 
-    async def add_task(self, coro: Callable[..., Any], *args, **kwargs):
-        await self.queue.put((coro, args, kwargs))
-        if not self.is_running:
-            asyncio.create_task(self.run())
+    @property
+    def size(self) -> int:
+        """Tasks accepted but not yet started."""
+        return self._waiting
 
-    async def run(self):
+    def start(self):
+        if self.is_running:
+            return
         self.is_running = True
-        while not self.queue.empty():
-            coro, args, kwargs = await self.queue.get()
+        self._tasks = [asyncio.create_task(self.run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.is_running = False
+
+    async def add_task(
+        self,
+        coro: Callable[..., Any],
+        *args,
+        key: Optional[str] = None,
+        lane: str = "batch",
+        tenant: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        Queue ``coro(*args, **kwargs)`` on ``lane`` on behalf of ``tenant``
+        (defaults to ``key``). Waits for a free slot while the queue is full;
+        raises QueueFull if none frees up within ``timeout`` seconds (``None``
+        waits forever, ``0`` fails immediately).
+        """
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown lane {lane!r}")
+        if timeout == 0 and self._slots.locked():
+            raise QueueFull("Task queue is full")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise QueueFull("Task queue is full")
+
+        tenant = tenant or key or "default"
+        task = _Task(coro, args, kwargs, key, lane, tenant, self.weights.get(tenant, 1.0))
+        self._waiting += 1
+        if key is not None and key in self._keyed:
+            self._keyed[key].append(task)
+        else:
+            if key is not None:
+                self._keyed[key] = deque()
+            self._push(task)
+        self.start()
+
+    def _push(self, task: _Task):
+        self.lanes[task.lane].push(task)
+        self._ready.release()
+
+    def _pop(self) -> _Task:
+        for lane in self.lanes.values():
+            if lane:
+                return lane.pop()
+        raise RuntimeError("No task ready")
+
+    async def run(self):
+        while True:
+            await self._ready.acquire()
+            task = self._pop()
+            self._waiting -= 1
+            self._slots.release()
             try:
-                await coro(*args, **kwargs)
-            except Exception as e:
-                print(f" Task failed: {e}")
+                await task.coro(*task.args, **task.kwargs)
+            except Exception:
+                logger.exception("Task failed: %s", getattr(task.coro, "__name__", task.coro))
             finally:
-                self.queue.task_done()
-        self.is_running = False
+                self._release_key(task.key)
+
+    def _release_key(self, key: Optional[str]):
+        if key is None:
+            return
+        pending = self._keyed.get(key)
+        if pending:
+            self._push(pending.popleft())
+        else:
+            self._keyed.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "maxsize": self.maxsize,
+            "queued": self._waiting,
+            "lanes": {
+                name: {"depth": len(lane), "wait_seconds": lane.wait_time.snapshot()}
+                for name, lane in self.lanes.items()
+            },
+        }
+
+
+task_queue = TaskQueue(
+    workers=settings.TASK_QUEUE_WORKERS,
+    maxsize=settings.TASK_QUEUE_MAXSIZE,
+    weights=settings.TASK_QUEUE_TENANT_WEIGHTS,
+)
 
-task_queue = TaskQueue()
+metrics.gauge(
+    "task_queue_depth", "Tasks waiting per lane",
+    lambda: {(name,): len(lane) for name, lane in task_queue.lanes.items()}, ("lane",),
+)
+metrics.histogram_source(
+    "task_queue_wait_seconds", "Time tasks wait in the queue before a worker picks them up",
+    lambda: {(name,): lane.wait_time for name, lane in task_queue.lanes.items()}, ("lane",),
+)
@@ -0,0 +1,174 @@
+"""
+Job worker: claims jobs from the durable queue and runs them.
+
+    python -m app.worker [--concurrency 4] [--name NAME]
+    python -m app.worker --dead                 # list dead-lettered jobs
+    python -m app.worker --requeue-dead JOB_ID  # give one a fresh set of attempts
+
+The API process runs a worker too unless JOB_WORKER_IN_API is off, so
+execution scales by starting more of these. Run events only reach
+WebSocket clients connected to other processes with STREAM_BACKEND=redis,
+and workers share jobs across hosts only with JOB_QUEUE_BACKEND=redis or a
+shared database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set
+from app.config import settings
+from app.services.workflow_service import RUN_JOB, run_workflow_job
+from app.utils.job_queue import Job, JobQueue, job_queue
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+HANDLERS: Dict[str, Callable[[dict], Awaitable]] = {
+    RUN_JOB: run_workflow_job,
+}
+
+_jobs_total = metrics.counter("jobs_total", "Jobs finished by this process, by outcome", ("kind", "outcome"))
+_job_seconds = metrics.histogram("job_seconds", "Time from claiming a job to finishing it", ("kind",))
+
+
+class Worker:
+    """
+    Keeps up to ``concurrency`` jobs running, renewing each one's lease
+    every third of ``lease`` seconds. A job whose handler raises is retried
+    or dead-lettered by the queue; on stop, unfinished jobs are handed back.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[dict], Awaitable]],
+                 concurrency: int = 4, lease: float = 60, poll_interval: float = 1.0,
+                 name: Optional[str] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._running: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._claim_loop())
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop claiming, give running jobs ``timeout`` seconds, then cancel and hand them back."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _claim_loop(self):
+        while True:
+            free = self.concurrency - len(self._running)
+            if free <= 0:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                jobs = await self.queue.claim(self.name, free, self.lease, wait=self.poll_interval)
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for job in jobs:
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if not await self.queue.extend(job, self.lease):
+                    logger.warning("Lost the lease on job %s; it may run twice", job.id)
+                    return
+            except Exception:
+                logger.exception("Renewing the lease on job %s failed", job.id)
+
+    async def _run(self, job: Job):
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        outcome = "completed"
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            await handler(job.payload)
+        except asyncio.CancelledError:
+            outcome = "released"
+            await self.queue.release(job)
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed on attempt %d", job.id, job.kind, job.attempts)
+            outcome = "retried" if await self.queue.fail(job, f"{type(e).__name__}: {e}") else "dead"
+        else:
+            await self.queue.complete(job)
+        finally:
+            heartbeat.cancel()
+            _jobs_total.labels(job.kind, outcome).inc()
+            _job_seconds.labels(job.kind).observe(time.perf_counter() - started)
+
+
+def create_worker(name: Optional[str] = None, concurrency: Optional[int] = None) -> Worker:
+    return Worker(
+        job_queue, HANDLERS,
+        concurrency=concurrency or settings.JOB_WORKER_CONCURRENCY,
+        lease=settings.JOB_LEASE_SECONDS,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        name=name,
+    )
+
+
+async def serve(name: Optional[str], concurrency: Optional[int]):
+    from app.llm.provider import llm_registry
+    from app.utils.stream_manager import stream_manager
+
+    await stream_manager.start()
+    worker = create_worker(name, concurrency)
+    worker.start()
+    logger.info("Worker %s started (%s queue, %d concurrent jobs)",
+                worker.name, settings.JOB_QUEUE_BACKEND, worker.concurrency)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    await stopping.wait()
+
+    logger.info("Worker %s stopping", worker.name)
+    await worker.stop(settings.JOB_SHUTDOWN_TIMEOUT)
+    await llm_registry.aclose()
+    await stream_manager.stop()
+
+
+async def _dead_letters(requeue: Optional[str]):
+    if requeue:
+        ok = await job_queue.requeue_dead(requeue)
+        print("requeued" if ok else "not found, or a job with the same key is active")
+        return
+    for job in await job_queue.dead_letters():
+        print(json.dumps(job, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--name", default=None, help="consumer name; defaults to host-pid-random")
+    parser.add_argument("--dead", action="store_true", help="list dead-lettered jobs and exit")
+    parser.add_argument("--requeue-dead", metavar="JOB_ID", default=None)
+    args = parser.parse_args()
+    if args.dead or args.requeue_dead:
+        asyncio.run(_dead_letters(args.requeue_dead))
+    else:
+        asyncio.run(serve(args.name, args.concurrency))
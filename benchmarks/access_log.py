@@ -0,0 +1,79 @@
+"""
+Request throughput of a small FastAPI app with no access log, with the old
+BaseHTTPMiddleware logger (two synchronous log lines per request) and with
+AccessLogMiddleware (one JSON record through a queue). Both loggers write
+to a temporary file.
+
+    python -m benchmarks.access_log [--requests 5000] [--concurrency 50] [--sample-rate 1.0]
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middleware.logging import AccessLog, AccessLogMiddleware
+
+
+class _OldLoggingMiddleware(BaseHTTPMiddleware):
+    # What app/middleware/logging.py used to do
+    async def dispatch(self, request: Request, call_next):
+        logging.info(f"Incoming: {request.method} {request.url}")
+        resp = await call_next(request)
+        logging.info(f"Response: {resp.status_code} {request.url}")
+        return resp
+
+
+def _app(middleware=None, **options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id, "name": f"item-{item_id}"}
+
+    if middleware:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+async def _measure(label: str, app: FastAPI, requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(requests))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in remaining:
+                (await client.get(f"/items/{i}")).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    print(f"{label:>14}: {requests / elapsed:8.0f} req/s")
+
+
+async def main(requests: int, concurrency: int, sample_rate: float):
+    with tempfile.TemporaryFile("w+") as out:
+        await _measure("no logging", _app(), requests, concurrency)
+
+        root = logging.getLogger()
+        handler = logging.StreamHandler(out)
+        handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        await _measure("old middleware", _app(_OldLoggingMiddleware), requests, concurrency)
+        root.removeHandler(handler)
+
+        access_log = AccessLog(out)
+        access_log.start()
+        await _measure("access log", _app(AccessLogMiddleware, sample_rate=sample_rate), requests, concurrency)
+        access_log.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sample-rate", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.sample_rate))
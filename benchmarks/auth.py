@@ -0,0 +1,105 @@
+"""
+Per-request cost of bearer-token auth: decode_token with a cold cache (full
+signature check) and a warm one, for HS256, RS256 and ES256 keys, and the
+throughput of a small FastAPI route with and without the verify_token
+dependency.
+
+    python -m benchmarks.auth [--calls 20000] [--requests 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from fastapi import Depends, FastAPI
+import app.auth as auth
+from app.config import settings
+
+# 32+ bytes, or PyJWT warns on every call
+_HS_SECRET = "benchmark-hs256-secret-0123456789"
+
+
+def _keys(workdir: str):
+    """A KeySet with one key per algorithm, and a token signed by each."""
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    jwks = {"keys": [
+        {**jwt.algorithms.RSAAlgorithm.to_jwk(rsa_key.public_key(), as_dict=True), "kid": "rsa-1", "alg": "RS256"},
+        {**jwt.algorithms.ECAlgorithm.to_jwk(ec_key.public_key(), as_dict=True), "kid": "ec-1", "alg": "ES256"},
+    ]}
+    path = os.path.join(workdir, "jwks.json")
+    with open(path, "w") as f:
+        json.dump(jwks, f)
+    key_set = auth.KeySet(None, {"hs-1": _HS_SECRET}, path)
+
+    claims = {"sub": "bench", "exp": int(time.time()) + 3600}
+    tokens = {
+        "HS256": jwt.encode(claims, _HS_SECRET, "HS256", headers={"kid": "hs-1"}),
+        "RS256": jwt.encode(claims, rsa_key, "RS256", headers={"kid": "rsa-1"}),
+        "ES256": jwt.encode(claims, ec_key, "ES256", headers={"kid": "ec-1"}),
+    }
+    return key_set, tokens
+
+
+def _per_call(token: str, calls: int, cached: bool) -> float:
+    auth.decode_token(token)
+    start = time.perf_counter()
+    for _ in range(calls):
+        if not cached:
+            auth.token_cache.clear()
+        auth.decode_token(token)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def _throughput(app: FastAPI, token: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(requests))
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def worker():
+            for _ in remaining:
+                (await client.get("/item")).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def _app(dependencies) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/item", dependencies=dependencies)
+    async def item():
+        return {"ok": True}
+
+    return app
+
+
+async def main(calls: int, requests: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        auth.key_set, tokens = _keys(workdir)
+        settings.AUTH_ENABLED = True
+
+        print(f"{'alg':>6} {'uncached':>12} {'cached':>12}")
+        for alg, token in tokens.items():
+            cold = _per_call(token, calls if alg == "HS256" else calls // 10, cached=False)
+            warm = _per_call(token, calls, cached=True)
+            print(f"{alg:>6} {cold:>10.1f}us {warm:>10.1f}us")
+
+        token = tokens["RS256"]
+        plain = await _throughput(_app([]), token, requests, concurrency)
+        authed = await _throughput(_app([Depends(auth.verify_token)]), token, requests, concurrency)
+        print(f"no auth: {plain:.0f} req/s | verify_token (RS256, cached): {authed:.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.requests, args.concurrency))
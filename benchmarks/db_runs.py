@@ -0,0 +1,55 @@
+"""
+Runs created per second through RunManager under different database
+configurations: SQLite with the default WAL/NORMAL pragmas, SQLite with
+the old rollback-journal/FULL defaults and, given --postgres-url, Postgres.
+
+    python -m benchmarks.db_runs [--runs 2000] [--concurrency 20] [--postgres-url URL]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.database import Base, create_db_engine, sqlite_pragmas
+from app.services.run_manager import run_manager
+import app.models  # noqa: F401
+
+
+async def _measure(label: str, engine, runs: int, concurrency: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    remaining = iter(range(runs))
+
+    async def worker():
+        async with session() as db:
+            for i in remaining:
+                run_id = await run_manager.create(db, f"bench-{i}", meta={"i": i})
+                await run_manager.update(db, run_id, status="completed", result={"ok": True})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    print(f"{label:>16}: {runs} runs in {elapsed:.2f}s | {runs / elapsed:.0f} runs/s")
+
+
+async def main(runs: int, concurrency: int, postgres_url: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = {"journal_mode": "DELETE", "synchronous": "FULL"}
+        for label, pragmas in (("sqlite wal", sqlite_pragmas()), ("sqlite legacy", legacy)):
+            url = f"sqlite+aiosqlite:///{os.path.join(tmp, label.replace(' ', '_'))}.db"
+            await _measure(label, create_db_engine(url, pragmas), runs, concurrency)
+    if postgres_url:
+        await _measure("postgres", create_db_engine(postgres_url), runs, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--postgres-url", default=None, help="drops and recreates the schema")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.concurrency, args.postgres_url))
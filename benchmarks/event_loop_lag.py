@@ -0,0 +1,56 @@
+"""
+Event-loop lag while many runs write artifacts concurrently, comparing a
+blocking ``open()``/``write()`` (the old ``save_bytes``) with ``atomic_write``.
+
+    python -m benchmarks.event_loop_lag [--runs 50] [--size-kb 2048]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from app.utils.aio_files import atomic_write
+from app.utils.metrics import LoopLagMonitor
+
+
+async def _measure(label: str, save, runs: int, data: bytes):
+    monitor = LoopLagMonitor(interval=0.005)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(save(f"run{i}", "bench.bin", data) for i in range(runs)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    lag = monitor.lag
+    print(
+        f"{label:>6}: {runs} writes in {elapsed:.3f}s | "
+        f"max lag {monitor.max_lag * 1000:.1f}ms | mean lag {lag.sum / max(lag.count, 1) * 1000:.2f}ms "
+        f"over {lag.count} samples"
+    )
+
+
+async def main(runs: int, size_kb: int):
+    data = os.urandom(size_kb * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        def path(run_id, name):
+            return os.path.join(tmp, f"{run_id}_{uuid.uuid4().hex}_{name}")
+
+        async def blocking(run_id, name, payload):
+            with open(path(run_id, name), "wb") as f:
+                f.write(payload)
+
+        async def non_blocking(run_id, name, payload):
+            await atomic_write(path(run_id, name), payload)
+
+        await _measure("before", blocking, runs, data)
+        await _measure("after", non_blocking, runs, data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.size_kb))
@@ -0,0 +1,332 @@
+"""
+Concurrent load test of the HTTP and WebSocket API.
+
+Starts the app in-process (temporary SQLite database, mock LLM) or targets
+a running server with --url, then for --duration seconds drives a mix of
+run creation, chat turns with WebSocket subscribers and artifact uploads.
+Each run creator waits for its run to finish before starting the next, so
+runs/sec counts completed runs, not accepted POSTs. Reports p50/p95/p99
+latency per operation, runs/sec, tokens/sec delivered
+to sockets and peak RSS, optionally as JSON. With --baseline the results
+are compared to an earlier JSON file and the exit status is 1 on a
+regression beyond --max-regression.
+
+    python -m benchmarks.load [--duration 20] [--runs 4] [--chat 8] [--subscribers 2]
+                              [--uploads 2] [--upload-kb 256] [--url URL]
+                              [--output results.json] [--baseline base.json]
+
+Against --url the server should run with LLM_PROVIDER=mock,
+LLM_CACHE_ENABLED=false and RATE_LIMIT_ENABLED=false for comparable
+numbers; peak RSS is then the client's only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.tokens = 0
+
+    def record(self, op: str, seconds: float):
+        self.latencies[op].append(seconds)
+
+    def error(self, op: str):
+        self.errors[op] += 1
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+# ---- in-process server ----
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args) -> tuple:
+    """Run the app with uvicorn in a background thread; returns (base_url, stop)."""
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    # Settings are read at import time, so configure before importing the app
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "LLM_PROVIDER": "mock",
+        "LLM_CACHE_ENABLED": "false",
+        "LLM_MOCK_LATENCY": str(args.mock_latency),
+        "LLM_MOCK_TOKENS_PER_SEC": str(args.mock_tps),
+        "RECOVER_RUNS_ON_STARTUP": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "ACCESS_LOG_ENABLED": "false",
+    })
+    os.chdir(workdir)
+    import uvicorn
+    from app.init_db import upgrade
+    upgrade()
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning", access_log=False,
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("server failed to start")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+# ---- workers ----
+
+_TERMINAL = ("completed", "failed", "cancelled")
+
+
+async def run_worker(client: httpx.AsyncClient, rec: Recorder, deadline: float,
+                     poll_interval: float = 0.05, timeout: float = 120):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            r = await client.post("/api/runs/", json={"workflow_id": "default", "payload": {"input": "bench"}})
+            r.raise_for_status()
+            rec.record("create_run", time.perf_counter() - started)
+        except Exception:
+            rec.error("create_run")
+            continue
+        run_id = r.json()["run_id"]
+        try:
+            # "run" is POST to terminal status, as seen by polling
+            while True:
+                await asyncio.sleep(poll_interval)
+                r = await client.get(f"/api/runs/{run_id}")
+                r.raise_for_status()
+                status = r.json()["status"]
+                if status in _TERMINAL:
+                    break
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(run_id)
+            if status != "completed":
+                raise RuntimeError(f"run {run_id} {status}")
+            rec.record("run", time.perf_counter() - started)
+        except Exception:
+            rec.error("run")
+
+
+async def _listen(ws, rec: Recorder, events: Optional[asyncio.Queue] = None):
+    async for raw in ws:
+        payload = json.loads(raw)
+        event = payload.get("event")
+        if event == "token":
+            rec.tokens += len(payload["content"].split())
+        if events is not None:
+            await events.put(event)
+
+
+async def chat_worker(client: httpx.AsyncClient, rec: Recorder, deadline: float, ws_url: str, subscribers: int):
+    thread_id = str(uuid.uuid4())
+    uri = f"{ws_url}/api/ws/{thread_id}"
+    sockets = [await websockets.connect(uri) for _ in range(subscribers + 1)]
+    for ws in sockets:
+        await ws.recv()  # greeting
+    events: asyncio.Queue = asyncio.Queue()
+    listeners = [asyncio.create_task(_listen(sockets[0], rec, events))]
+    listeners += [asyncio.create_task(_listen(ws, rec)) for ws in sockets[1:]]
+    try:
+        turn = 0
+        while time.monotonic() < deadline:
+            turn += 1
+            started = time.perf_counter()
+            try:
+                r = await client.post(f"/api/chat/{thread_id}/message", json={"message": f"question {turn}"})
+                r.raise_for_status()
+                first = True
+                while True:
+                    event = await asyncio.wait_for(events.get(), timeout=60)
+                    if event == "token" and first:
+                        first = False
+                        rec.record("chat_first_token", time.perf_counter() - started)
+                    elif event == "completed":
+                        break
+                rec.record("chat_turn", time.perf_counter() - started)
+            except Exception:
+                rec.error("chat_turn")
+    finally:
+        for task in listeners:
+            task.cancel()
+        for ws in sockets:
+            await ws.close()
+
+
+async def upload_worker(client: httpx.AsyncClient, rec: Recorder, deadline: float, size: int):
+    run_id = f"bench-{uuid.uuid4()}"
+    while time.monotonic() < deadline:
+        # Fresh bytes each time so content-addressed storage cannot dedupe them
+        files = {"file": ("bench.bin", os.urandom(size), "application/octet-stream")}
+        started = time.perf_counter()
+        try:
+            r = await client.post(f"/api/artifacts/upload/{run_id}", files=files)
+            r.raise_for_status()
+            rec.record("upload", time.perf_counter() - started)
+        except Exception:
+            rec.error("upload")
+
+
+# ---- reporting ----
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def summarize(rec: Recorder, elapsed: float, config: dict) -> dict:
+    ops = {}
+    for op in sorted(set(rec.latencies) | set(rec.errors)):
+        values = rec.latencies.get(op, [])
+        ops[op] = {
+            "count": len(values),
+            "errors": rec.errors.get(op, 0),
+            "per_sec": round(len(values) / elapsed, 2),
+            "mean": round(sum(values) / len(values), 5) if values else 0.0,
+            "p50": round(percentile(values, 50), 5),
+            "p95": round(percentile(values, 95), 5),
+            "p99": round(percentile(values, 99), 5),
+        }
+    return {
+        "commit": _git_commit(),
+        "config": config,
+        "elapsed": round(elapsed, 2),
+        "ops": ops,
+        # Runs that reached "completed", not POSTs accepted
+        "runs_per_sec": ops.get("run", {}).get("per_sec", 0.0),
+        "tokens_per_sec": round(rec.tokens / elapsed, 1),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Latency percentiles that grew, or throughputs that fell, by more than ``tolerance``."""
+    found = []
+    for op, stats in result["ops"].items():
+        base = baseline.get("ops", {}).get(op)
+        if not base:
+            continue
+        for key in ("p95", "p99"):
+            if base[key] and stats[key] > base[key] * (1 + tolerance):
+                found.append(f"{op} {key} {base[key]:.4f}s -> {stats[key]:.4f}s")
+        if base["per_sec"] and stats["per_sec"] < base["per_sec"] * (1 - tolerance):
+            found.append(f"{op} per_sec {base['per_sec']} -> {stats['per_sec']}")
+    base_tps = baseline.get("tokens_per_sec")
+    if base_tps and result["tokens_per_sec"] < base_tps * (1 - tolerance):
+        found.append(f"tokens_per_sec {base_tps} -> {result['tokens_per_sec']}")
+    return found
+
+
+def print_report(result: dict):
+    print(f"{'operation':>18} {'count':>7} {'err':>5} {'/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for op, s in result["ops"].items():
+        print(
+            f"{op:>18} {s['count']:>7} {s['errors']:>5} {s['per_sec']:>8} "
+            f"{s['p50'] * 1000:>7.1f}ms {s['p95'] * 1000:>7.1f}ms {s['p99'] * 1000:>7.1f}ms"
+        )
+    print(
+        f"completed runs/sec {result['runs_per_sec']} | tokens/sec {result['tokens_per_sec']} | "
+        f"peak RSS {result['peak_rss_mb']} MB"
+    )
+
+
+async def drive(base_url: str, args) -> dict:
+    rec = Recorder()
+    ws_url = "ws" + base_url[len("http"):]
+    limits = httpx.Limits(max_connections=args.runs + args.chat + args.uploads + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(run_worker(client, rec, deadline) for _ in range(args.runs)),
+            *(chat_worker(client, rec, deadline, ws_url, args.subscribers) for _ in range(args.chat)),
+            *(upload_worker(client, rec, deadline, args.upload_kb * 1024) for _ in range(args.uploads)),
+        )
+        elapsed = time.perf_counter() - started
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    return summarize(rec, elapsed, config)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="target a running server instead of starting one")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=4, help="concurrent run creators, one run in flight each")
+    parser.add_argument("--chat", type=int, default=8, help="concurrent chat threads")
+    parser.add_argument("--subscribers", type=int, default=2, help="extra WebSocket subscribers per chat thread")
+    parser.add_argument("--uploads", type=int, default=2, help="concurrent uploaders")
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--mock-latency", type=float, default=0.05)
+    parser.add_argument("--mock-tps", type=float, default=200)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output) if args.output else None
+
+    stop = None
+    base_url = args.url
+    if base_url is None:
+        base_url, stop = start_server(args)
+    try:
+        result = asyncio.run(drive(base_url.rstrip("/"), args))
+    finally:
+        if stop:
+            stop()
+
+    print_report(result)
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+    if baseline:
+        found = regressions(result, baseline, args.max_regression)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
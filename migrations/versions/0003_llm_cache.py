@@ -0,0 +1,38 @@
+"""llm_cache table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 13:42:08.519306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_cache',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tokens', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('llm_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_llm_cache_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('llm_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_llm_cache_expires_at'))
+
+    op.drop_table('llm_cache')
@@ -0,0 +1,31 @@
+"""runs listing indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:03:27.771540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('runs', schema=None) as batch_op:
+        batch_op.create_index('ix_runs_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_runs_status_created_at', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_runs_status_created_at')
+        batch_op.drop_index('ix_runs_created_at_id')
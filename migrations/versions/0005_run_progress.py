@@ -0,0 +1,34 @@
+"""run progress columns
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:31:52.083316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_node', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('node_status', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('nodes_completed', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('runs', schema=None) as batch_op:
+        batch_op.drop_column('nodes_completed')
+        batch_op.drop_column('node_status')
+        batch_op.drop_column('current_node')
@@ -0,0 +1,40 @@
+"""job lanes and tenants
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 13:49:10.141335
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('tenant', sa.String(), server_default='default', nullable=False))
+        batch_op.add_column(sa.Column('fair_at', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index('ix_jobs_status_priority_fair_at', ['status', 'priority', 'fair_at'], unique=False)
+        batch_op.create_index('ix_jobs_tenant_fair_at', ['tenant', 'fair_at'], unique=False)
+
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_tenant_fair_at')
+        batch_op.drop_index('ix_jobs_status_priority_fair_at')
+        batch_op.drop_column('fair_at')
+        batch_op.drop_column('tenant')
+        batch_op.drop_column('priority')
+